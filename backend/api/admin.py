@@ -1,7 +1,6 @@
 from django.contrib import admin
 
-from .models import (FavoriteRecipe, Ingredient, Recipe, ShoppingCart,
-                     Subscription, Tag)
+from .models import Ingredient, Recipe, ShoppingCart, Subscription, Tag
 
 
 class TagInlines(admin.TabularInline):
@@ -42,8 +41,13 @@ class RecipeAdmin(admin.ModelAdmin):
 
     inlines = (TagInlines, RecipeIngredientsInline)
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        Recipe.objects.filter(pk=form.instance.pk).update_search_vector()
+
     # noinspection PyMethodMayBeStatic
     def favorited(self, obj):
-        return FavoriteRecipe.objects.filter(recipe=obj).count()
+        return obj.favorites_count
 
     favorited.short_description = 'В избранном'
+    favorited.admin_order_field = 'favorites_count'
@@ -0,0 +1,62 @@
+from functools import partial, wraps
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.urls import URLPattern
+
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def run_read(view, request, *args, **kwargs):
+    """
+    Runs a view in a pool thread, rendering the response there as well
+    and closing the connection of the thread afterwards
+    """
+    try:
+        response = view(request, *args, **kwargs)
+        if callable(getattr(response, 'render', None)):
+            response = response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+def read_in_pool(view):
+    """
+    Async variant of a view. Under ASGI Django runs every synchronous view
+    in one shared thread, so concurrent reads wait for each other; here they
+    run in the thread pool and overlap their database I/O, while writes stay
+    in the shared thread.
+    """
+    read = sync_to_async(partial(run_read, view), thread_sensitive=False)
+    write = sync_to_async(view, thread_sensitive=True)
+
+    @wraps(view)
+    async def async_view(request, *args, **kwargs):
+        if request.method in READ_METHODS:
+            return await read(request, *args, **kwargs)
+        return await write(request, *args, **kwargs)
+
+    return async_view
+
+
+def read_in_pool_patterns(patterns, viewsets, actions=('list', 'retrieve')):
+    """
+    Patterns with list and detail views of the given viewsets replaced by
+    async variants
+    """
+    return [
+        URLPattern(
+            pattern.pattern, read_in_pool(pattern.callback),
+            pattern.default_args, pattern.name
+        )
+        if is_read_route(pattern.callback, viewsets, actions) else pattern
+        for pattern in patterns
+    ]
+
+
+def is_read_route(view, viewsets, actions):
+    return (
+        getattr(view, 'cls', None) in viewsets
+        and getattr(view, 'actions', {}).get('get') in actions
+    )
@@ -0,0 +1,34 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+
+
+def token_cache_key(key):
+    return 'token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def forget_tokens(keys):
+    """
+    Drops cached lookups of the tokens, e.g. after logout or user changes
+    """
+    caches[settings.TOKEN_CACHE_ALIAS].delete_many(
+        [token_cache_key(key) for key in keys]
+    )
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication keeping token and user snapshots for
+    TOKEN_CACHE_TTL seconds in the shared cache, or in a process-local LRU
+    when no shared cache is configured
+    """
+    def authenticate_credentials(self, key):
+        cache = caches[settings.TOKEN_CACHE_ALIAS]
+        cache_key = token_cache_key(key)
+        token = cache.get(cache_key)
+        if token is None:
+            user, token = super().authenticate_credentials(key)
+            cache.set(cache_key, token, settings.TOKEN_CACHE_TTL)
+        return token.user, token
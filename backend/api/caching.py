@@ -0,0 +1,155 @@
+import hashlib
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers)
+from django.utils.http import http_date
+
+from .models import TableVersion
+
+
+class ConditionalGetMixin:
+    """
+    Answers If-None-Match / If-Modified-Since with 304 using the table
+    version, before the query and the serializer run. The ETag depends on
+    the Accept header, so JSON and the browsable API don't share it.
+    """
+    versioned_model = None
+    cache_max_age = 60
+
+    def get_etag(self, request, version):
+        query = sorted(request.GET.lists())
+        accept = request.META.get('HTTP_ACCEPT', '')
+        key = f'{request.path}?{query}#{accept}#{version.version}'
+        return f'"{hashlib.sha1(key.encode()).hexdigest()}"'
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+
+        self.table_version = TableVersion.objects.current(
+            self.versioned_model
+        )
+        etag = self.get_etag(request, self.table_version)
+        last_modified = int(self.table_version.updated_at.timestamp())
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = super().dispatch(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ('Accept',))
+        patch_cache_control(response, public=True, max_age=self.cache_max_age)
+        return response
+
+
+class ResponseCache:
+    """
+    Rendered responses kept in a configured cache backend. Entries are
+    invalidated by bumping generation counters which are part of the keys.
+    """
+    def __init__(self, prefix, alias='default', timeout=300):
+        self.prefix = prefix
+        self.alias = alias
+        self.timeout = timeout
+        self.stats = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def _count(self, event):
+        with self._lock:
+            self.stats[event] += 1
+
+    def generations(self, *names):
+        keys = [f'{self.prefix}:generation:{name}' for name in names]
+        values = self.cache.get_many(keys)
+        for key in keys:
+            if key not in values:
+                # A fresh value keeps entries of an evicted counter unused
+                self.cache.add(key, time.time_ns(), timeout=None)
+                values[key] = self.cache.get(key)
+        return [values[key] for key in keys]
+
+    def bump(self, name):
+        key = f'{self.prefix}:generation:{name}'
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            self.cache.add(key, time.time_ns(), timeout=None)
+
+    def get(self, key):
+        cached = self.cache.get(f'{self.prefix}:{key}')
+        self._count('hits' if cached is not None else 'misses')
+        return cached
+
+    def set(self, key, content_type, content):
+        self.cache.set(
+            f'{self.prefix}:{key}', (content_type, content), self.timeout
+        )
+
+
+recipe_response_cache = ResponseCache(
+    'recipes',
+    alias=settings.RESPONSE_CACHE_ALIAS,
+    timeout=settings.RESPONSE_CACHE_TIMEOUT,
+)
+
+
+class AnonymousResponseCacheMixin:
+    """
+    Serves GET responses of anonymous users from the response cache.
+    Detail keys include the object generation, list keys the generation
+    of the whole list, both include the generation of related data.
+    """
+    response_cache = None
+
+    def get_response_cache_key(self, request, pk=None):
+        query = sorted(
+            (name, sorted(values)) for name, values in request.GET.lists()
+        )
+        accept = request.META.get('HTTP_ACCEPT', '')
+        if pk is None:
+            related, generation = self.response_cache.generations(
+                'related', 'list'
+            )
+        else:
+            related, generation = self.response_cache.generations(
+                'related', f'detail:{pk}'
+            )
+        key = (f'{request.get_host()}{request.path}?{query}#{accept}'
+               f'#{related}:{generation}')
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    def dispatch(self, request, *args, **kwargs):
+        if (request.method != 'GET'
+                or 'HTTP_AUTHORIZATION' in request.META):
+            return super().dispatch(request, *args, **kwargs)
+
+        key = self.get_response_cache_key(request, kwargs.get('pk'))
+        cached = self.response_cache.get(key)
+        if cached is not None:
+            content_type, content = cached
+            return HttpResponse(content, content_type=content_type)
+
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code != 200 or not hasattr(response, 'render'):
+            return response
+
+        response.render()
+        content_type = response['Content-Type']
+        if content_type.startswith('application/json'):
+            self.response_cache.set(key, content_type, response.content)
+        return response
@@ -0,0 +1,40 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import FavoriteRecipe, Recipe, Subscription
+
+
+def change_counter(queryset, field, delta):
+    """
+    Atomically shifts a counter column, never below zero
+    """
+    queryset.update(**{field: Greatest(F(field) + delta, 0)})
+
+
+def count_of(queryset, field):
+    return Coalesce(Subquery(
+        queryset.filter(
+            **{field: OuterRef('pk')}
+        ).order_by().values(field).annotate(
+            total=Count('pk')
+        ).values('total')
+    ), 0)
+
+
+def reconcile_counters():
+    """
+    Recomputes counter columns, returns the number of fixed rows per counter
+    """
+    counters = (
+        (Recipe.objects, 'favorites_count',
+         count_of(FavoriteRecipe.objects, 'recipe')),
+        (get_user_model().objects, 'recipes_count',
+         count_of(Recipe.objects, 'author')),
+        (get_user_model().objects, 'subscribers_count',
+         count_of(Subscription.objects, 'author')),
+    )
+    return {
+        field: manager.exclude(**{field: actual}).update(**{field: actual})
+        for manager, field, actual in counters
+    }
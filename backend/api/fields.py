@@ -0,0 +1,115 @@
+import base64
+import binascii
+import tempfile
+import uuid
+
+from django.conf import settings
+from django.core.files import File
+from PIL import Image
+from rest_framework import serializers
+
+SIGNATURES = {
+    b'\xff\xd8\xff': 'JPEG',
+    b'\x89PNG\r\n\x1a\n': 'PNG',
+    b'GIF87a': 'GIF',
+    b'GIF89a': 'GIF',
+}
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+DATA_URI_SEPARATOR = ';base64,'
+WHITESPACE = str.maketrans('', '', ' \t\r\n')
+
+
+def detect_format(header):
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'WEBP'
+    for signature, image_format in SIGNATURES.items():
+        if header.startswith(signature):
+            return image_format
+    return None
+
+
+class Base64ImageField(serializers.ImageField):
+    """
+    Image sent as a Base64 string or data URI. The payload is decoded in
+    chunks into a spooled temporary file, its size, format and pixel count
+    are checked before Pillow decodes the pixels.
+    """
+    default_error_messages = {
+        'invalid': 'Ожидалось изображение в формате Base64',
+        'too_large': 'Размер изображения не может превышать {max_size} байт',
+        'invalid_format': 'Допустимые форматы изображения: {formats}',
+        'too_many_pixels': ('Изображение не может содержать больше '
+                            '{max_pixels} пикселей'),
+    }
+    chunk_size = 64 * 1024
+    spool_size = 1024 * 1024
+
+    def __init__(self, max_size=None, max_pixels=None, **kwargs):
+        self.max_size = max_size or settings.RECIPE_IMAGE_MAX_SIZE
+        self.max_pixels = max_pixels or settings.RECIPE_IMAGE_MAX_PIXELS
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str):
+            self.fail('invalid')
+
+        # The payload is addressed by offset to avoid copying the string
+        offset = data.find(DATA_URI_SEPARATOR, 0, 100)
+        offset = 0 if offset == -1 else offset + len(DATA_URI_SEPARATOR)
+        # Every 4 characters of Base64 hold 3 bytes
+        if (len(data) - offset) // 4 * 3 > self.max_size + 2:
+            self.fail('too_large', max_size=self.max_size)
+
+        file = tempfile.SpooledTemporaryFile(max_size=self.spool_size)
+        try:
+            image_format = self.decode(data, offset, file)
+            self.check_image(file, image_format)
+        except Exception:
+            file.close()
+            raise
+
+        file.seek(0)
+        return File(file, name=f'{uuid.uuid4()}.{EXTENSIONS[image_format]}')
+
+    def decode(self, data, offset, file):
+        image_format, remainder = None, ''
+        for start in range(offset, len(data), self.chunk_size):
+            chunk = remainder + data[start:start + self.chunk_size]
+            chunk = chunk.translate(WHITESPACE)
+            usable = len(chunk) - len(chunk) % 4
+            try:
+                decoded = base64.b64decode(chunk[:usable], validate=True)
+            except binascii.Error:
+                self.fail('invalid')
+            remainder = chunk[usable:]
+
+            if image_format is None:
+                image_format = detect_format(decoded[:12])
+                if image_format is None:
+                    self.fail(
+                        'invalid_format', formats=', '.join(EXTENSIONS)
+                    )
+            file.write(decoded)
+            if file.tell() > self.max_size:
+                self.fail('too_large', max_size=self.max_size)
+
+        if remainder or image_format is None:
+            self.fail('invalid')
+        return image_format
+
+    def check_image(self, file, image_format):
+        file.seek(0)
+        try:
+            # Only the header is read here, pixels are not decoded
+            image = Image.open(file)
+            width, height = image.size
+        except Exception:
+            self.fail('invalid_image')
+        if image.format != image_format:
+            self.fail('invalid_image')
+        if width * height > self.max_pixels:
+            self.fail('too_many_pixels', max_pixels=self.max_pixels)
+        try:
+            image.verify()
+        except Exception:
+            self.fail('invalid_image')
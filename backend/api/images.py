@@ -0,0 +1,111 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+
+from .models import Recipe
+
+logger = logging.getLogger(__name__)
+
+RENDITIONS = {
+    'card': (480, 480),
+    'thumbnail': (160, 160),
+}
+FORMATS = {
+    'jpg': ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_RENDITION_WORKERS,
+                thread_name_prefix='recipe-images',
+            )
+    return _executor
+
+
+def _render(image, size, image_format, options):
+    rendition = image.copy()
+    rendition.thumbnail(size, Image.LANCZOS)
+    if image_format == 'JPEG' and rendition.mode != 'RGB':
+        background = Image.new('RGB', rendition.size, 'white')
+        rendition = rendition.convert('RGBA')
+        background.paste(rendition, mask=rendition.getchannel('A'))
+        rendition = background
+    content = ContentFile(b'')
+    rendition.save(content, image_format, **options)
+    return content
+
+
+def build_renditions(recipe_id, image_name):
+    """
+    Saves resized copies of the recipe image and stores their paths
+    """
+    with default_storage.open(image_name) as file:
+        image = ImageOps.exif_transpose(Image.open(file))
+        image.load()
+
+    directory, filename = os.path.split(image_name)
+    stem = os.path.splitext(filename)[0]
+    variants = {'source': image_name}
+    for name, size in RENDITIONS.items():
+        for extension, (image_format, options) in FORMATS.items():
+            content = _render(image, size, image_format, options)
+            path = os.path.join(
+                directory, 'variants', f'{stem}_{name}.{extension}'
+            )
+            variants[f'{name}_{extension}'] = default_storage.save(
+                path, content
+            )
+
+    recipe = Recipe.objects.filter(pk=recipe_id, image=image_name)
+    previous = recipe.values_list('image_variants', flat=True).first()
+    if recipe.update(image_variants=variants):
+        delete_renditions(previous or {})
+    else:
+        # The image was replaced while the renditions were being built
+        delete_renditions(variants)
+
+
+def _run(recipe_id, image_name):
+    try:
+        build_renditions(recipe_id, image_name)
+    except Exception:
+        logger.exception('Не удалось обработать изображение %s', image_name)
+    finally:
+        connection.close()
+
+
+def schedule_renditions(recipe):
+    """
+    Hands the recipe image to the worker pool once the transaction commits.
+    Without workers the renditions are built in place.
+    """
+    recipe_id, image_name = recipe.pk, recipe.image.name
+
+    def submit():
+        if settings.IMAGE_RENDITION_WORKERS:
+            _get_executor().submit(_run, recipe_id, image_name)
+        else:
+            build_renditions(recipe_id, image_name)
+
+    transaction.on_commit(submit)
+
+
+def delete_renditions(variants):
+    for key, path in variants.items():
+        if key != 'source':
+            default_storage.delete(path)
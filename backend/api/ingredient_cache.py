@@ -0,0 +1,76 @@
+import bisect
+import heapq
+import json
+import threading
+
+from .models import Ingredient
+
+
+class IngredientCatalogue:
+    """
+    Ingredients sorted by lowercased name with pre-rendered JSON rows.
+    Prefix lookups are answered with two binary searches.
+    """
+    def __init__(self, ingredients, version=None):
+        self.version = version
+        rows = {}
+        for ingredient_id, name, measurement_unit in sorted(
+            ingredients, key=lambda row: (row[1], row[0])
+        ):
+            rows.setdefault(name, (ingredient_id, name, measurement_unit))
+        rows = sorted(rows.values(), key=lambda row: (row[1].lower(), row))
+
+        self.names = [name.lower() for _, name, _ in rows]
+        self.rendered = [
+            json.dumps({
+                'id': ingredient_id,
+                'name': name,
+                'measurement_unit': measurement_unit,
+            }, ensure_ascii=False, separators=(',', ':')).encode()
+            for ingredient_id, name, measurement_unit in rows
+        ]
+        # Shorter names rank first, like trigram similarity of a prefix
+        by_length = sorted(
+            range(len(rows)), key=lambda i: (len(self.names[i]), i)
+        )
+        self.ranks = [0] * len(rows)
+        for rank, index in enumerate(by_length):
+            self.ranks[index] = rank
+
+    def __len__(self):
+        return len(self.names)
+
+    def prefix_range(self, prefix):
+        prefix = prefix.lower()
+        start = bisect.bisect_left(self.names, prefix)
+        end = bisect.bisect_left(self.names, prefix + '\U0010ffff', start)
+        return start, end
+
+    def render(self, start, end, limit):
+        indexes = heapq.nsmallest(
+            limit, range(start, end), key=self.ranks.__getitem__
+        )
+        return b'[' + b','.join(self.rendered[i] for i in indexes) + b']'
+
+
+_catalogue = None
+_lock = threading.Lock()
+
+
+def get_catalogue(version):
+    """
+    Process-wide catalogue, rebuilt when the ingredient table version changes
+    """
+    global _catalogue
+    catalogue = _catalogue
+    if catalogue is None or catalogue.version != version:
+        with _lock:
+            if _catalogue is None or _catalogue.version != version:
+                _catalogue = IngredientCatalogue(
+                    Ingredient.objects.values_list(
+                        'id', 'name', 'measurement_unit'
+                    ).iterator(),
+                    version
+                )
+            catalogue = _catalogue
+    return catalogue
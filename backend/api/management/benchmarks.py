@@ -0,0 +1,24 @@
+from django.conf import settings
+
+
+def percentile(timings, percent):
+    ordered = sorted(timings)
+    index = min(len(ordered) - 1, round(percent / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def request_host():
+    """
+    A host accepted by ALLOWED_HOSTS for requests built by benchmarks
+    """
+    for host in settings.ALLOWED_HOSTS:
+        if host != '*':
+            return host.lstrip('.')
+    return 'localhost'
+
+
+def report(stdout, timings):
+    for label, percent in (('p50', 50), ('p95', 95), ('p99', 99)):
+        value = percentile(timings, percent) * 1000
+        stdout.write(f'{label}: {value:.2f} мс')
+    stdout.write(f'max: {max(timings) * 1000:.2f} мс')
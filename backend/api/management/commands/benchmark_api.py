@@ -0,0 +1,127 @@
+import random
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.management.benchmarks import percentile, request_host
+from api.models import Ingredient, Recipe, Subscription, Tag
+
+
+class Command(BaseCommand):
+    help = ('Замеряет задержку и количество SQL-запросов основных '
+            'эндпоинтов API, при необходимости догенерировав данные')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scales', type=int, nargs='*', default=(),
+            help='Количества рецептов, до которых догенерировать данные '
+                 'перед замером, например 1000 10000 100000'
+        )
+        parser.add_argument('--requests', type=int, default=30,
+                            help='Запросов на каждый эндпоинт')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        for scale in options['scales'] or (None,):
+            if scale is not None:
+                missing = scale - Recipe.objects.count()
+                if missing > 0:
+                    call_command(
+                        'generate_data', recipes=missing,
+                        seed=options['seed'] + scale, stdout=self.stdout
+                    )
+            self.run(options['requests'])
+
+    def get_endpoints(self):
+        recipe_ids = list(Recipe.objects.values_list('id', flat=True)[:1000])
+        slugs = list(Tag.objects.values_list('slug', flat=True))
+        ingredients = list(Ingredient.objects.values_list('id', 'name')[:500])
+        if not recipe_ids or not slugs or not ingredients:
+            raise CommandError(
+                'Недостаточно данных, запустите generate_data или '
+                'укажите --scales'
+            )
+        pick = self.random.choice
+        return (
+            ('recipes', lambda: ('/api/recipes/', {
+                'page': self.random.randint(1, 20), 'limit': 6
+            })),
+            ('recipes: tags', lambda: ('/api/recipes/', {
+                'tags': self.random.sample(slugs, min(2, len(slugs))),
+                'limit': 6
+            })),
+            ('recipes: is_favorited', lambda: ('/api/recipes/', {
+                'is_favorited': 1, 'limit': 6
+            })),
+            ('recipes: search', lambda: ('/api/recipes/', {
+                'search': pick(('суп', 'салат', 'пирог', 'с сыром')),
+                'limit': 6
+            })),
+            ('recipes: cookable', lambda: ('/api/recipes/cookable/', {
+                'ingredients': [
+                    ingredient_id for ingredient_id, _
+                    in self.random.sample(ingredients, 10)
+                ],
+                'limit': 6
+            })),
+            ('recipe', lambda: (f'/api/recipes/{pick(recipe_ids)}/', {})),
+            ('subscriptions', lambda: ('/api/users/subscriptions/', {
+                'limit': 6, 'recipes_limit': 3
+            })),
+            ('ingredients', lambda: ('/api/ingredients/', {
+                'name': pick(ingredients)[1][:self.random.randint(1, 4)]
+            })),
+            ('tags', lambda: ('/api/tags/', {})),
+            ('download_shopping_cart', lambda: (
+                '/api/recipes/download_shopping_cart/', {}
+            )),
+        )
+
+    def get_client(self):
+        subscriber_ids = list(Subscription.objects.order_by(
+            'subscriber'
+        ).values_list('subscriber', flat=True).distinct())
+        if not subscriber_ids:
+            raise CommandError('Нет пользователей с подписками')
+        token, _ = Token.objects.get_or_create(
+            user_id=self.random.choice(subscriber_ids)
+        )
+        client = APIClient(HTTP_HOST=request_host())
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        return client
+
+    def measure(self, client, endpoint, count):
+        timings, queries = [], []
+        for _ in range(count):
+            url, params = endpoint()
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = client.get(url, params)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                timings.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                raise CommandError(f'{url}: ответ {response.status_code}')
+            queries.append(len(context))
+        return timings, queries
+
+    def run(self, count):
+        client = self.get_client()
+        self.stdout.write(f'Рецептов: {Recipe.objects.count()}')
+        self.stdout.write(
+            f'{"эндпоинт":<26}{"p50, мс":>10}{"p99, мс":>10}{"SQL":>8}'
+        )
+        for name, endpoint in self.get_endpoints():
+            timings, queries = self.measure(client, endpoint, count)
+            self.stdout.write(
+                f'{name:<26}'
+                f'{percentile(timings, 50) * 1000:>10.2f}'
+                f'{percentile(timings, 99) * 1000:>10.2f}'
+                f'{sum(queries) / len(queries):>8.1f}'
+            )
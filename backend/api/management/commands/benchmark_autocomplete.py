@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIRequestFactory
+
+from api.management.benchmarks import report, request_host
+from api.models import Ingredient
+from api.views import IngredientViewSet
+
+
+class Command(BaseCommand):
+    help = ('Замеряет время ответа автодополнения ингредиентов '
+            'на каждое нажатие клавиши')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'words', nargs='*',
+            help='Набираемые слова, по умолчанию случайные ингредиенты'
+        )
+        parser.add_argument('--sample', type=int, default=50)
+        parser.add_argument('--limit', type=int, default=20)
+
+    def handle(self, *args, **options):
+        words = options['words'] or Ingredient.objects.order_by(
+            '?'
+        ).values_list('name', flat=True)[:options['sample']]
+        view = IngredientViewSet.as_view({'get': 'list'})
+        factory = APIRequestFactory(HTTP_HOST=request_host())
+        timings = []
+
+        for word in words:
+            for end in range(1, len(word) + 1):
+                request = factory.get(
+                    '/api/ingredients/',
+                    {'name': word[:end], 'limit': options['limit']}
+                )
+                started = time.perf_counter()
+                view(request).render()
+                timings.append(time.perf_counter() - started)
+
+        if not timings:
+            self.stdout.write('Нет данных для замера')
+            return
+
+        self.stdout.write(f'Нажатий: {len(timings)}')
+        report(self.stdout, timings)
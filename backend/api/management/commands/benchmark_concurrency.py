@@ -0,0 +1,90 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+from api.management.benchmarks import percentile
+from api.models import Recipe
+
+DEFAULT_PATHS = (
+    '/api/recipes/?limit=6', '/api/recipes/{recipe}/', '/api/tags/',
+    '/api/ingredients/',
+)
+
+
+class Command(BaseCommand):
+    help = ('Замеряет пропускную способность запущенного сервера при '
+            'одновременных соединениях, чтобы сравнить WSGI и ASGI')
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help='Например http://localhost:8000')
+        parser.add_argument('--concurrency', type=int, nargs='+',
+                            default=(1, 8, 32, 64))
+        parser.add_argument('--duration', type=float, default=10,
+                            help='Секунд на каждый уровень')
+        parser.add_argument('--paths', nargs='+', default=DEFAULT_PATHS,
+                            help='{recipe} заменяется id случайного рецепта')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.url = options['url'].rstrip('/')
+        self.paths = options['paths']
+        self.recipe_ids = list(
+            Recipe.objects.values_list('id', flat=True)[:1000]
+        )
+        if not self.recipe_ids:
+            raise CommandError('Нет рецептов, запустите generate_data')
+        self.random = random.Random(options['seed'])
+        self.lock = threading.Lock()
+        self.stdout.write(
+            f'{"соединений":<12}{"запр./с":>10}{"p50, мс":>10}'
+            f'{"p99, мс":>10}{"ошибок":>8}'
+        )
+        for concurrency in options['concurrency']:
+            self.run(concurrency, options['duration'])
+
+    def pick(self):
+        with self.lock:
+            return self.random.choice(self.paths).format(
+                recipe=self.random.choice(self.recipe_ids)
+            )
+
+    def connection(self, deadline):
+        """
+        One keep-alive connection sending requests until the deadline
+        """
+        timings, errors = [], 0
+        with requests.Session() as session:
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = session.get(self.url + self.pick())
+                except requests.RequestException:
+                    errors += 1
+                    continue
+                if response.status_code != 200:
+                    errors += 1
+                    continue
+                timings.append(time.perf_counter() - started)
+        return timings, errors
+
+    def run(self, concurrency, duration):
+        deadline = time.monotonic() + duration
+        with ThreadPoolExecutor(concurrency) as executor:
+            results = list(executor.map(
+                self.connection, [deadline] * concurrency
+            ))
+        timings = [timing for result in results for timing in result[0]]
+        errors = sum(result[1] for result in results)
+        if not timings:
+            raise CommandError(f'{self.url}: нет успешных ответов')
+        self.stdout.write(
+            f'{concurrency:<12}'
+            f'{len(timings) / duration:>10.1f}'
+            f'{percentile(timings, 50) * 1000:>10.2f}'
+            f'{percentile(timings, 99) * 1000:>10.2f}'
+            f'{errors:>8}'
+        )
@@ -0,0 +1,49 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIRequestFactory
+
+from api.management.benchmarks import report, request_host
+from api.models import Ingredient, Recipe
+from api.views import RecipeViewSet
+
+
+class Command(BaseCommand):
+    help = ('Замеряет время поиска рецептов по имеющимся ингредиентам '
+            'на случайных наборах ингредиентов')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sample', type=int, default=50)
+        parser.add_argument(
+            '--size', type=int, default=10,
+            help='Количество ингредиентов в наборе'
+        )
+        parser.add_argument('--limit', type=int, default=6)
+
+    def handle(self, *args, **options):
+        ingredient_ids = list(Ingredient.objects.filter(
+            recipeingredients__isnull=False
+        ).distinct().values_list('id', flat=True))
+        if not ingredient_ids:
+            self.stdout.write('Нет данных для замера')
+            return
+
+        view = RecipeViewSet.as_view({'get': 'cookable'})
+        factory = APIRequestFactory(HTTP_HOST=request_host())
+        size = min(options['size'], len(ingredient_ids))
+        timings = []
+
+        for _ in range(options['sample']):
+            request = factory.get('/api/recipes/cookable/', {
+                'ingredients': random.sample(ingredient_ids, size),
+                'limit': options['limit'],
+            })
+            started = time.perf_counter()
+            view(request).render()
+            timings.append(time.perf_counter() - started)
+
+        self.stdout.write(
+            f'Рецептов: {Recipe.objects.count()}, запросов: {len(timings)}'
+        )
+        report(self.stdout, timings)
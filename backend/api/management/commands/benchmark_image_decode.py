@@ -0,0 +1,124 @@
+import base64
+import io
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image
+
+from api.fields import Base64ImageField
+
+
+def decode_in_memory(data):
+    """
+    Previous behaviour: the whole payload decoded into one bytes object
+    """
+    content = base64.b64decode(data.partition(';base64,')[2])
+    image = Image.open(io.BytesIO(content))
+    image.verify()
+    return content
+
+
+def decode_streaming(data):
+    # The limits must let the benchmark payload through
+    file = Base64ImageField(
+        max_size=len(data), max_pixels=sys.maxsize
+    ).to_internal_value(data)
+    file.close()
+
+
+DECODERS = {
+    'в памяти': decode_in_memory,
+    'потоково': decode_streaming,
+}
+
+
+def reset_peak_rss():
+    """
+    Lowers the peak resident set size to the current one, so that reading
+    the payload is not counted. Linux only, elsewhere the peak stays.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as file:
+            file.write('5')
+    except OSError:
+        pass
+
+
+def peak_rss():
+    """
+    Peak resident set size of this process in bytes
+    """
+    try:
+        with open('/proc/self/status') as file:
+            for line in file:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пиковое потребление памяти (RSS) при декодировании '
+            'изображения в Base64, каждый способ в отдельном процессе')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--width', type=int, default=3000)
+        parser.add_argument('--height', type=int, default=2000)
+        # Used by the child processes
+        parser.add_argument('--measure', choices=DECODERS,
+                            help='Замерить один способ на файле --payload')
+        parser.add_argument('--payload')
+
+    def handle(self, *args, **options):
+        if options['measure']:
+            self.measure(options['measure'], options['payload'])
+            return
+
+        buffer = io.BytesIO()
+        Image.effect_noise(
+            (options['width'], options['height']), 64
+        ).convert('RGB').save(buffer, 'JPEG', quality=95)
+        data = 'data:image/jpeg;base64,' + base64.b64encode(
+            buffer.getvalue()
+        ).decode()
+        self.stdout.write(f'Размер строки Base64: {len(data)} байт')
+
+        with tempfile.NamedTemporaryFile('w', suffix='.b64') as payload:
+            payload.write(data)
+            payload.flush()
+            for label in DECODERS:
+                self.stdout.write(f'{label}: {self.run_child(label, payload)}')
+
+    # noinspection PyMethodMayBeStatic
+    def run_child(self, label, payload):
+        result = subprocess.run(
+            (sys.executable, '-m', 'django', 'benchmark_image_decode',
+             '--measure', label, '--payload', payload.name),
+            # DJANGO_SETTINGS_MODULE is inherited from manage.py
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+        )
+        if result.returncode:
+            raise CommandError(result.stderr)
+        return result.stdout.strip()
+
+    def measure(self, label, path):
+        with open(path) as file:
+            data = file.read()
+        reset_peak_rss()
+        before = peak_rss()
+        started = time.perf_counter()
+        DECODERS[label](data)
+        elapsed = time.perf_counter() - started
+        growth = peak_rss() - before
+        self.stdout.write(
+            f'прирост пикового RSS {growth / 1024:.0f} КБ, '
+            f'{elapsed * 1000:.1f} мс'
+        )
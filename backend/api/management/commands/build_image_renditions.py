@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from api.images import build_renditions
+from api.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Создает уменьшенные копии изображений рецептов, у которых их нет'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Пересоздать копии для всех рецептов'
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='').values_list(
+            'id', 'image', 'image_variants'
+        )
+        built = 0
+        for recipe_id, image, variants in recipes.iterator():
+            if not options['all'] and variants.get('source') == image:
+                continue
+            build_renditions(recipe_id, image)
+            built += 1
+        self.stdout.write(self.style.SUCCESS(f'Обработано рецептов: {built}'))
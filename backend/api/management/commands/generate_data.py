@@ -0,0 +1,175 @@
+import io
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from PIL import Image
+
+from api.caching import recipe_response_cache
+from api.counters import reconcile_counters
+from api.models import (FavoriteRecipe, Ingredient, Recipe, RecipeIngredients,
+                        ShoppingCart, Subscription, TableVersion, Tag)
+from users.models import CustomUser
+
+from .load_ingredients import DEFAULT_PATH
+
+IMAGE_NAME = 'recipe_images/generated.png'
+PASSWORD = 'generated-password'
+WORDS = (
+    'суп', 'салат', 'пирог', 'омлет', 'каша', 'рагу', 'запеканка', 'блины',
+    'домашний', 'быстрый', 'острый', 'сладкий', 'летний', 'постный',
+    'с курицей', 'с грибами', 'с сыром', 'с овощами', 'по-деревенски',
+)
+
+
+class Command(BaseCommand):
+    help = ('Добавляет синтетические данные: пользователей, тэги, рецепты, '
+            'избранное, списки покупок и подписки')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--users', type=int, default=None,
+                            help='По умолчанию один на 10 рецептов')
+        parser.add_argument('--tags', type=int, default=10)
+        parser.add_argument('--ingredients-per-recipe', type=int, nargs=2,
+                            default=(3, 12), metavar=('MIN', 'MAX'))
+        parser.add_argument('--favorites-per-user', type=int, default=20)
+        parser.add_argument('--cart-per-user', type=int, default=5)
+        parser.add_argument('--subscriptions-per-user', type=int, default=10)
+        parser.add_argument('--ingredients-file', default=str(DEFAULT_PATH))
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        started = time.perf_counter()
+
+        if not Ingredient.objects.exists():
+            call_command('load_ingredients', options['ingredients_file'],
+                         stdout=self.stdout)
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        if not ingredient_ids:
+            raise CommandError('Нет ингредиентов для рецептов')
+
+        with transaction.atomic():
+            user_ids = self.create_users(
+                options['users'] or max(1, options['recipes'] // 10)
+            )
+            tag_ids = self.create_tags(options['tags'])
+            recipe_ids = self.create_recipes(
+                options['recipes'], user_ids, tag_ids, ingredient_ids,
+                options['ingredients_per_recipe']
+            )
+            self.create_relations(user_ids, options)
+            Recipe.objects.filter(pk__in=recipe_ids).update_search_vector()
+            reconcile_counters()
+            TableVersion.objects.bump(Tag)
+        recipe_response_cache.bump('related')
+        recipe_response_cache.bump('list')
+
+        self.stdout.write(
+            f'Пользователей: {len(user_ids)}, рецептов: {len(recipe_ids)} '
+            f'за {time.perf_counter() - started:.1f} с'
+        )
+
+    def create_users(self, count):
+        start = CustomUser.objects.count()
+        password = make_password(PASSWORD)
+        users = CustomUser.objects.bulk_create([
+            CustomUser(
+                username=f'generated_{number}',
+                email=f'generated_{number}@example.com',
+                first_name='Пользователь', last_name=str(number),
+                password=password,
+            ) for number in range(start, start + count)
+        ], batch_size=self.batch_size)
+        return [user.id for user in users]
+
+    def create_tags(self, count):
+        for number in range(Tag.objects.count(), count):
+            Tag.objects.create(
+                name=f'Тэг {number}', slug=f'tag-{number}',
+                color=f'#{self.random.randrange(0x1000000):06X}'
+            )
+        return list(Tag.objects.values_list('id', flat=True)[:count])
+
+    def get_image(self):
+        if not default_storage.exists(IMAGE_NAME):
+            buffer = io.BytesIO()
+            Image.new('RGB', (480, 480), '#3399FF').save(buffer, 'PNG')
+            default_storage.save(IMAGE_NAME, ContentFile(buffer.getvalue()))
+        return IMAGE_NAME
+
+    def create_recipes(self, count, user_ids, tag_ids, ingredient_ids,
+                       ingredients_range):
+        image = self.get_image()
+        recipe_ids = []
+        for offset in range(0, count, self.batch_size):
+            recipes = Recipe.objects.bulk_create([
+                Recipe(
+                    author_id=self.random.choice(user_ids),
+                    name=' '.join(self.random.sample(WORDS, 2)).capitalize(),
+                    text=' '.join(self.random.choices(WORDS, k=20)),
+                    cooking_time=self.random.randint(5, 180),
+                    image=image,
+                ) for _ in range(min(self.batch_size, count - offset))
+            ])
+            batch_ids = [recipe.id for recipe in recipes]
+            self.add_ingredients(batch_ids, ingredient_ids, ingredients_range)
+            self.add_tags(batch_ids, tag_ids)
+            recipe_ids.extend(batch_ids)
+        return recipe_ids
+
+    def add_ingredients(self, recipe_ids, ingredient_ids, ingredients_range):
+        RecipeIngredients.objects.bulk_create([
+            RecipeIngredients(
+                recipe_id=recipe_id, ingredient_id=ingredient_id,
+                amount=self.random.randint(1, 500)
+            )
+            for recipe_id in recipe_ids
+            for ingredient_id in self.random.sample(
+                ingredient_ids,
+                min(self.random.randint(*ingredients_range),
+                    len(ingredient_ids))
+            )
+        ], batch_size=self.batch_size)
+
+    def add_tags(self, recipe_ids, tag_ids):
+        if not tag_ids:
+            return
+        recipe_tags = Recipe.tags.through
+        recipe_tags.objects.bulk_create([
+            recipe_tags(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in self.random.sample(
+                tag_ids, self.random.randint(1, min(3, len(tag_ids)))
+            )
+        ], batch_size=self.batch_size)
+
+    def create_relations(self, user_ids, options):
+        all_recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+        all_user_ids = list(CustomUser.objects.values_list('id', flat=True))
+        relations = (
+            (FavoriteRecipe, 'recipe_id', all_recipe_ids,
+             options['favorites_per_user']),
+            (ShoppingCart, 'recipe_id', all_recipe_ids,
+             options['cart_per_user']),
+            (Subscription, 'author_id', all_user_ids,
+             options['subscriptions_per_user']),
+        )
+        for model, target, target_ids, per_user in relations:
+            owner = 'subscriber_id' if model is Subscription else 'user_id'
+            model.objects.bulk_create([
+                model(**{owner: user_id, target: target_id})
+                for user_id in user_ids
+                for target_id in self.random.sample(
+                    target_ids, min(per_user, len(target_ids))
+                )
+                if model is not Subscription or target_id != user_id
+            ], batch_size=self.batch_size, ignore_conflicts=True)
@@ -0,0 +1,154 @@
+import csv
+import io
+import json
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from api.models import Ingredient, TableVersion
+
+DEFAULT_PATH = settings.BASE_DIR.parent / 'data' / 'ingredient.json'
+SEPARATORS = ' \t\r\n,'
+
+
+class JSONArrayReader:
+    """
+    Yields items of a top-level JSON array reading the file chunk by chunk
+    """
+    def __init__(self, file, chunk_size=64 * 1024):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer, self.position, self.eof = '', 0, False
+
+    def read_more(self):
+        if self.eof:
+            raise CommandError('Неожиданный конец файла')
+        chunk = self.file.read(self.chunk_size)
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position, self.eof = 0, not chunk
+
+    def next_char(self, separators=SEPARATORS):
+        while True:
+            while (self.position < len(self.buffer)
+                   and self.buffer[self.position] in separators):
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            self.read_more()
+
+    def __iter__(self):
+        if self.next_char(separators=SEPARATORS[:-1]) != '[':
+            raise CommandError('Ожидался список ингредиентов')
+        self.position += 1
+
+        while self.next_char() != ']':
+            try:
+                item, self.position = self.decoder.raw_decode(
+                    self.buffer, self.position
+                )
+            except json.JSONDecodeError as error:
+                if self.eof:
+                    raise CommandError(f'Ошибка разбора JSON: {error}')
+                self.read_more()
+                continue
+            yield item
+
+
+class Command(BaseCommand):
+    help = 'Загружает ингредиенты из JSON файла пакетами через COPY'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default=str(DEFAULT_PATH),
+            help='Путь к JSON файлу, "-" для чтения из stdin'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        units = {unit for _, unit in Ingredient.MEASUREMENT_UNIT_LIST}
+        batch, loaded, skipped = {}, 0, 0
+        started = time.perf_counter()
+
+        with self.open(options['path']) as file, transaction.atomic():
+            with connection.cursor() as cursor:
+                self.create_staging_table(cursor)
+                for item in JSONArrayReader(file):
+                    row = self.to_row(item, units)
+                    if row is None:
+                        skipped += 1
+                        continue
+                    batch[row[0]] = row
+                    if len(batch) >= options['batch_size']:
+                        loaded += self.upsert(cursor, batch.values())
+                        batch = {}
+                if batch:
+                    loaded += self.upsert(cursor, batch.values())
+                for sql in connection.ops.sequence_reset_sql(
+                    no_style(), [Ingredient]
+                ):
+                    cursor.execute(sql)
+            TableVersion.objects.bump(Ingredient)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено: {loaded}, пропущено: {skipped}, '
+            f'{elapsed:.2f} с, {loaded / max(elapsed, 1e-9):.0f} строк/с'
+        ))
+
+    # noinspection PyMethodMayBeStatic
+    def open(self, path):
+        if path == '-':
+            return io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8')
+        try:
+            return open(path, encoding='utf-8')
+        except OSError as error:
+            raise CommandError(f'Не удалось открыть файл: {error}')
+
+    def to_row(self, item, units):
+        try:
+            row = (
+                int(item['id']),
+                str(item['name']).strip()[:200],
+                str(item['measurement_unit']).strip(),
+            )
+        except (KeyError, TypeError, ValueError):
+            self.stderr.write(f'Пропущена некорректная запись: {item}')
+            return None
+        if row[2] not in units:
+            self.stderr.write(f'Неизвестная единица измерения: {item}')
+            return None
+        return row
+
+    # noinspection PyMethodMayBeStatic
+    def create_staging_table(self, cursor):
+        cursor.execute(
+            'CREATE TEMPORARY TABLE ingredient_staging ('
+            'id bigint, name varchar(200), measurement_unit varchar(200)'
+            ') ON COMMIT DROP'
+        )
+
+    # noinspection PyMethodMayBeStatic
+    def upsert(self, cursor, rows):
+        data = io.StringIO()
+        csv.writer(data).writerows(rows)
+        data.seek(0)
+        cursor.copy_expert(
+            'COPY ingredient_staging (id, name, measurement_unit) '
+            'FROM STDIN WITH (FORMAT csv)',
+            data
+        )
+        table = Ingredient._meta.db_table
+        cursor.execute(
+            f'INSERT INTO {table} (id, name, measurement_unit) '
+            f'SELECT id, name, measurement_unit FROM ingredient_staging '
+            f'ON CONFLICT (id) DO UPDATE SET name = EXCLUDED.name, '
+            f'measurement_unit = EXCLUDED.measurement_unit'
+        )
+        loaded = cursor.rowcount
+        cursor.execute('TRUNCATE ingredient_staging')
+        return loaded
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает счетчики избранного, рецептов и подписчиков '
+            'по фактическим данным')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            fixed = reconcile_counters()
+        for field, rows in fixed.items():
+            self.stdout.write(f'{field}: исправлено записей {rows}')
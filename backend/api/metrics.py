@@ -0,0 +1,333 @@
+import asyncio
+import bisect
+import copy
+import fcntl
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+METRICS = {
+    'request_duration_seconds': (
+        'Время обработки запроса', DURATION_BUCKETS
+    ),
+    'db_queries': (
+        'Количество SQL-запросов на запрос', (1, 2, 5, 10, 20, 50, 100, 200)
+    ),
+    'db_duration_seconds': (
+        'Время SQL-запросов на запрос', DURATION_BUCKETS
+    ),
+    'db_pool_wait_seconds': (
+        'Время ожидания соединения из пула на запрос',
+        (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+    ),
+}
+PREFIX = 'foodgram_'
+# Sum of the dumps of exited workers
+RETIRED = 'retired.json'
+
+# Recorder of the request being handled
+current_recorder = ContextVar('current_recorder', default=None)
+
+
+def is_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def merge(dumps):
+    """
+    Histograms of the dumps summed up
+    """
+    total = {name: {} for name in METRICS}
+    for dump in dumps:
+        for name, data in dump.items():
+            for key, series in data.items():
+                summed = total[name].setdefault(key, {
+                    'buckets': [0] * len(series['buckets']), 'sum': 0
+                })
+                for index, count in enumerate(series['buckets']):
+                    summed['buckets'][index] += count
+                summed['sum'] += series['sum']
+    return total
+
+
+def read_dump(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def write_dump(path, data):
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w') as file:
+        json.dump(data, file)
+    os.replace(temporary, path)
+
+
+class Histograms:
+    """
+    Per-view histograms of this process. When a directory is given, every
+    worker dumps its histograms there and they are summed up on render.
+    Dumps of exited workers are merged into one retired dump, so that the
+    totals never go down.
+    """
+    def __init__(self, directory='', flush_interval=1.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.data = {name: {} for name in METRICS}
+        self.flushed_at = 0.0
+        self.pid = None
+
+    def observe(self, view, method, **values):
+        key = f'{view} {method}'
+        with self.lock:
+            for name, value in values.items():
+                buckets = METRICS[name][1]
+                series = self.data[name].setdefault(
+                    key, {'buckets': [0] * (len(buckets) + 1), 'sum': 0}
+                )
+                series['buckets'][bisect.bisect_left(buckets, value)] += 1
+                series['sum'] += value
+        if time.monotonic() - self.flushed_at >= self.flush_interval:
+            self.flush()
+
+    @property
+    def path(self):
+        return os.path.join(self.directory, f'{os.getpid()}.json')
+
+    def flush(self):
+        if not self.directory:
+            return
+        with self.lock:
+            data = copy.deepcopy(self.data)
+            self.flushed_at = time.monotonic()
+        os.makedirs(self.directory, exist_ok=True)
+        if self.pid != os.getpid():
+            # A dump under this pid was left by an exited worker
+            with self.directory_lock():
+                self.retire([self.path])
+            self.pid = os.getpid()
+        write_dump(self.path, data)
+
+    @contextmanager
+    def directory_lock(self):
+        with open(os.path.join(self.directory, '.lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def retire(self, paths):
+        """
+        Merges the dumps into the retired one and removes them. Called
+        with the directory locked.
+        """
+        dumps = [dump for dump in map(read_dump, paths) if dump is not None]
+        if dumps:
+            retired = os.path.join(self.directory, RETIRED)
+            write_dump(retired, merge([read_dump(retired) or {}, *dumps]))
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def read_workers(self):
+        """
+        Dumps of the other workers and the retired one. Dumps of exited
+        workers are retired first. Called with the directory locked.
+        """
+        running, exited = [], []
+        for name in os.listdir(self.directory):
+            pid = name[:-len('.json')]
+            if not (name.endswith('.json') and pid.isdigit()):
+                continue
+            if int(pid) != os.getpid():
+                path = os.path.join(self.directory, name)
+                (running if is_running(int(pid)) else exited).append(path)
+        if exited:
+            self.retire(exited)
+        paths = (*running, os.path.join(self.directory, RETIRED))
+        return [dump for dump in map(read_dump, paths) if dump is not None]
+
+    def collect(self):
+        """
+        Histograms of all workers summed up
+        """
+        with self.lock:
+            dumps = [copy.deepcopy(self.data)]
+        if self.directory and os.path.isdir(self.directory):
+            with self.directory_lock():
+                dumps.extend(self.read_workers())
+        return merge(dumps)
+
+    def render(self):
+        """
+        Prometheus text exposition format
+        """
+        lines = []
+        for name, data in self.collect().items():
+            description, buckets = METRICS[name]
+            metric = PREFIX + name
+            lines.append(f'# HELP {metric} {description}')
+            lines.append(f'# TYPE {metric} histogram')
+            for key in sorted(data):
+                view, method = key.rsplit(' ', 1)
+                labels = f'view="{view}",method="{method}"'
+                series = data[key]
+                cumulative = 0
+                for bound, count in zip(
+                    (*buckets, '+Inf'), series['buckets']
+                ):
+                    cumulative += count
+                    lines.append(
+                        f'{metric}_bucket{{{labels},le="{bound}"}} '
+                        f'{cumulative}'
+                    )
+                lines.append(f'{metric}_sum{{{labels}}} {series["sum"]}')
+                lines.append(f'{metric}_count{{{labels}}} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+
+histograms = Histograms(settings.METRICS_DIR, settings.METRICS_FLUSH_INTERVAL)
+
+
+def view_name(view_func, method):
+    """
+    RecipeViewSet.list for viewset actions, class name for DRF views
+    """
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return f'{view_func.__module__}.{view_func.__name__}'
+    actions = getattr(view_func, 'actions', None)
+    if actions:
+        return f'{cls.__name__}.{actions.get(method.lower(), "unknown")}'
+    return cls.__name__
+
+
+class QueryRecorder:
+    """
+    Counts and times SQL queries of a request, and sums the time pooled
+    connections waited for a free slot
+    """
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.pool_wait = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Execute wrapper of every connection, passing the query to the recorder
+    of the current request
+    """
+    recorder = current_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def connection_opened(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+    recorder = current_recorder.get()
+    pool_wait = getattr(connection, 'pool_wait', None)
+    if recorder is not None and pool_wait is not None:
+        recorder.pool_wait = (recorder.pool_wait or 0.0) + pool_wait
+
+
+class MetricsMiddleware:
+    """
+    Records wall time, SQL query count and SQL time per resolved view.
+
+    The recorder of the request is kept in a context variable, which
+    sync_to_async passes on, so under ASGI the queries are recorded in
+    whichever thread the view runs.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Marks the instance as a coroutine function for Django
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        current_recorder.set(recorder)
+        try:
+            response = self.get_response(request)
+        except Exception:
+            current_recorder.set(None)
+            raise
+        return self.respond(request, response, recorder, started)
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        current_recorder.set(recorder)
+        response = await self.get_response(request)
+        return self.respond(request, response, recorder, started)
+
+    def respond(self, request, response, recorder, started):
+        if response.streaming:
+            # Streamed content runs its queries while being sent
+            response.streaming_content = self.stream(
+                response.streaming_content, request, recorder, started
+            )
+        else:
+            self.finish(request, recorder, started)
+        return response
+
+    def stream(self, content, request, recorder, started):
+        try:
+            yield from content
+        finally:
+            self.finish(request, recorder, started)
+
+    # noinspection PyMethodMayBeStatic
+    def finish(self, request, recorder, started):
+        current_recorder.set(None)
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return
+        values = {
+            'request_duration_seconds': time.perf_counter() - started,
+            'db_queries': recorder.count,
+            'db_duration_seconds': recorder.duration,
+        }
+        if recorder.pool_wait is not None:
+            values['db_pool_wait_seconds'] = recorder.pool_wait
+        histograms.observe(
+            view_name(match.func, request.method), request.method, **values
+        )
@@ -0,0 +1,29 @@
+# Generated by Django 3.2.6 on 2026-10-18 10:12
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_auto_20211016_1521'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunSQL(
+            sql=(
+                'CREATE INDEX api_ingredient_name_prefix_idx '
+                'ON api_ingredient (lower(name) text_pattern_ops);'
+            ),
+            reverse_sql='DROP INDEX api_ingredient_name_prefix_idx;',
+        ),
+        migrations.RunSQL(
+            sql=(
+                'CREATE INDEX api_ingredient_name_trgm_idx '
+                'ON api_ingredient USING gin (lower(name) gin_trgm_ops);'
+            ),
+            reverse_sql='DROP INDEX api_ingredient_name_trgm_idx;',
+        ),
+    ]
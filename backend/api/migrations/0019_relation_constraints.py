@@ -0,0 +1,43 @@
+# Generated by Django 3.2.6 on 2026-10-18 18:52
+
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def remove_duplicates(apps, schema_editor):
+    Recipe = apps.get_model('api', 'Recipe')
+    FavoriteRecipe = apps.get_model('api', 'FavoriteRecipe')
+    for name in ('FavoriteRecipe', 'ShoppingCart'):
+        model = apps.get_model('api', name)
+        first_ids = model.objects.values('user', 'recipe').annotate(
+            first_id=Min('id')
+        ).values('first_id')
+        model.objects.exclude(id__in=first_ids).delete()
+
+    Recipe.objects.update(favorites_count=Coalesce(Subquery(
+        FavoriteRecipe.objects.filter(
+            recipe=OuterRef('pk')
+        ).order_by().values('recipe').annotate(
+            total=Count('pk')
+        ).values('total')
+    ), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='favoriterecipe',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='api_favoriterecipe_is_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='shoppingcart',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='api_shoppingcart_is_unique'),
+        ),
+    ]
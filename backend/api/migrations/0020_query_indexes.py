@@ -0,0 +1,45 @@
+# Generated by Django 3.2.6 on 2026-10-18 18:54
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    RecipeIngredients = apps.get_model('api', 'RecipeIngredients')
+    duplicates = RecipeIngredients.objects.values(
+        'recipe', 'ingredient'
+    ).annotate(
+        first_id=Min('id'), total=Sum('amount'), rows=Count('id')
+    ).filter(rows__gt=1)
+    for row in duplicates.iterator():
+        RecipeIngredients.objects.filter(pk=row['first_id']).update(
+            amount=min(row['total'], 32767)
+        )
+        RecipeIngredients.objects.filter(
+            recipe=row['recipe'], ingredient=row['ingredient']
+        ).exclude(pk=row['first_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_relation_constraints'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-id'], name='recipe_author_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subscription',
+            index=models.Index(fields=['subscriber', '-id'], name='subscription_subscriber_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='recipeingredients',
+            constraint=models.UniqueConstraint(fields=('recipe', 'ingredient'), name='unique_recipe_ingredient'),
+        ),
+    ]
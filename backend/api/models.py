@@ -1,9 +1,25 @@
 #  api/models.py
 from colorfield.fields import ColorField
+from django.contrib.auth import get_user_model
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector, SearchVectorField,
+                                            TrigramSimilarity)
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import connection, connections, models, transaction
+from django.db.models.expressions import RawSQL, Window
+from django.db.models.functions import Cast, Lower, RowNumber
+from django.db.models.signals import post_save
+from django.dispatch import Signal
+from django.utils import timezone
 
 from foodgram import settings
+from foodgram.counter_fields import CounterFieldsMixin
+
+# Sent by RelationQuerySet.add_many() and remove_many() with the target ids
+relations_added = Signal()
+relations_removed = Signal()
 
 
 class BaseRecipeClass(models.Model):
@@ -16,6 +32,37 @@ class BaseRecipeClass(models.Model):
         abstract = True
 
 
+class IngredientQuerySet(models.QuerySet):
+    TRIGRAM_MIN_LENGTH = 3
+
+    def autocomplete(self, name):
+        """
+        Ingredients matching the typed name, prefix matches ranked first.
+        Short names are looked up by prefix only, longer ones also by
+        substring and trigram similarity.
+        """
+        name = name.lower()
+        queryset = self.annotate(name_lower=Lower('name'))
+        condition = models.Q(name_lower__startswith=name)
+        if len(name) >= self.TRIGRAM_MIN_LENGTH:
+            condition |= (
+                models.Q(name_lower__contains=name)
+                | models.Q(name_lower__trigram_similar=name)
+            )
+        unique_names = queryset.filter(condition).order_by(
+            'name', 'id'
+        ).distinct('name').values('id')
+
+        return queryset.filter(id__in=unique_names).annotate(
+            is_prefix=models.Case(
+                models.When(name_lower__startswith=name, then=True),
+                default=False,
+                output_field=models.BooleanField(),
+            ),
+            similarity=TrigramSimilarity('name_lower', name),
+        ).order_by('-is_prefix', '-similarity', 'name')
+
+
 class Ingredient(BaseRecipeClass):
     MEASUREMENT_UNIT_LIST = [
         (1, 'л'), (2, 'бутылка'), (3, 'зубчик'), (4, 'щепотка'), (5, 'пачка'),
@@ -33,6 +80,8 @@ class Ingredient(BaseRecipeClass):
         default=19
     )
 
+    objects = IngredientQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
@@ -47,7 +96,131 @@ class Tag(BaseRecipeClass):
         verbose_name_plural = 'Тэги'
 
 
-class Recipe(BaseRecipeClass):
+class RecipeQuerySet(models.QuerySet):
+    def with_user_flags(self, user):
+        """
+        Annotates is_favorited and is_in_shopping_cart flags for the user
+        """
+        if user.is_anonymous:
+            return self.annotate(
+                is_favorited=models.Value(
+                    False, output_field=models.BooleanField()
+                ),
+                is_in_shopping_cart=models.Value(
+                    False, output_field=models.BooleanField()
+                ),
+            )
+        return self.annotate(
+            is_favorited=models.Exists(FavoriteRecipe.objects.filter(
+                user=user, recipe=models.OuterRef('pk')
+            )),
+            is_in_shopping_cart=models.Exists(ShoppingCart.objects.filter(
+                user=user, recipe=models.OuterRef('pk')
+            )),
+        )
+
+    def with_related(self, user):
+        """
+        Loads authors, tags and ingredients in a constant number of queries
+        """
+        authors = get_user_model().objects.all()
+        if user.is_anonymous:
+            authors = authors.annotate(is_subscribed=models.Value(
+                False, output_field=models.BooleanField()
+            ))
+        else:
+            authors = authors.annotate(is_subscribed=models.Exists(
+                Subscription.objects.filter(
+                    subscriber=user, author=models.OuterRef('pk')
+                )
+            ))
+        return self.prefetch_related(
+            models.Prefetch('author', queryset=authors),
+            'tags',
+            models.Prefetch(
+                'recipeingredients_set',
+                queryset=RecipeIngredients.objects.select_related(
+                    'ingredient'
+                )
+            ),
+        )
+
+    SEARCH_CONFIG = 'russian'
+
+    def search(self, text):
+        """
+        Full-text search over name, ingredients and text, best matches first
+        """
+        query = SearchQuery(
+            text, config=self.SEARCH_CONFIG, search_type='websearch'
+        )
+        return self.filter(search_vector=query).annotate(
+            search_rank=SearchRank(models.F('search_vector'), query)
+        ).order_by('-search_rank', '-id')
+
+    def update_search_vector(self):
+        """
+        Recomputes the stored search vector of the selected recipes
+        """
+        ingredient_names = RecipeIngredients.objects.filter(
+            recipe=models.OuterRef('pk')
+        ).order_by().values('recipe').annotate(
+            names=StringAgg('ingredient__name', ' ')
+        ).values('names')
+        return self.update(search_vector=(
+            SearchVector('name', weight='A', config=self.SEARCH_CONFIG)
+            + SearchVector(models.Subquery(ingredient_names), weight='B',
+                           config=self.SEARCH_CONFIG)
+            + SearchVector('text', weight='C', config=self.SEARCH_CONFIG)
+        ))
+
+    def with_coverage(self, ingredient_ids):
+        """
+        Recipes using any of the ingredients, best covered first.
+        coverage is the share of the recipe's ingredients among them.
+        """
+        recipe_ingredients = RecipeIngredients.objects.filter(
+            recipe=models.OuterRef('pk')
+        ).order_by().values('recipe')
+        matched = models.Count(
+            'pk', filter=models.Q(ingredient__in=ingredient_ids)
+        )
+        coverage = recipe_ingredients.annotate(
+            coverage=models.ExpressionWrapper(
+                Cast(matched, models.FloatField()) / models.Count('pk'),
+                output_field=models.FloatField()
+            )
+        ).values('coverage')
+        return self.filter(models.Exists(
+            recipe_ingredients.filter(ingredient__in=ingredient_ids)
+        )).annotate(
+            coverage=models.Subquery(coverage)
+        ).order_by('-coverage', '-id')
+
+    def latest_per_author(self, authors, limit=None):
+        """
+        Selects at most limit newest recipes of every author in one query
+        """
+        if not authors:
+            # The ranked subquery can't be compiled for an empty IN list
+            return self.none()
+        queryset = self.filter(author__in=authors)
+        if limit is not None:
+            ranked = queryset.annotate(author_rank=Window(
+                RowNumber(),
+                partition_by=models.F('author_id'),
+                order_by=models.F('id').desc(),
+            )).order_by().values('id', 'author_rank')
+            # Window functions can't be filtered in Django 3.2 directly
+            sql, params = ranked.query.sql_with_params()
+            queryset = queryset.filter(pk__in=RawSQL(
+                f'SELECT id FROM ({sql}) AS ranked WHERE author_rank <= %s',
+                (*params, limit)
+            ))
+        return queryset.order_by('-id')
+
+
+class Recipe(CounterFieldsMixin, BaseRecipeClass):
     author = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         verbose_name='Автор рецепта',
@@ -69,6 +242,18 @@ class Recipe(BaseRecipeClass):
         verbose_name='Изображение',
         upload_to='recipe_images'
     )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='В избранном', default=0, editable=False
+    )
+    search_vector = SearchVectorField(
+        verbose_name='Поисковый вектор', null=True, editable=False
+    )
+    image_variants = models.JSONField(
+        verbose_name='Уменьшенные копии изображения',
+        default=dict,
+        blank=True,
+        editable=False,
+    )
     text = models.TextField(verbose_name='Описание рецепта')
     cooking_time = models.PositiveSmallIntegerField(
         verbose_name='Время приготовления (в минутах)',
@@ -78,9 +263,19 @@ class Recipe(BaseRecipeClass):
         ]
     )
 
+    objects = RecipeQuerySet.as_manager()
+
+    counter_fields = ('favorites_count',)
+
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = (
+            models.Index(fields=('author', '-id'),
+                         name='recipe_author_id_idx'),
+            GinIndex(fields=('search_vector',),
+                     name='recipe_search_vector_idx'),
+        )
 
 
 class RecipeIngredients(models.Model):
@@ -104,11 +299,116 @@ class RecipeIngredients(models.Model):
     class Meta:
         verbose_name = 'Ингредиент рецепта'
         verbose_name_plural = 'Ингредиенты рецепта'
+        constraints = (
+            models.UniqueConstraint(fields=('recipe', 'ingredient'),
+                                    name='unique_recipe_ingredient'),
+        )
 
     def __str__(self):
         return f'{self._meta.verbose_name} {self.recipe.name}'
 
 
+class RelationQuerySet(models.QuerySet):
+    def add(self, target, only=None, **values):
+        """
+        Creates the relation unless it exists, loading its target in the
+        same round trip, with only the given fields if they are set. Returns
+        the relation and a created flag.
+        """
+        meta = self.model._meta
+        target_meta = meta.get_field(target).related_model._meta
+        quote = connection.ops.quote_name
+        columns = [quote(meta.get_field(name).column) for name in values]
+        if only is None:
+            target_columns = '*'
+        else:
+            names = dict.fromkeys((target_meta.pk.name, *only))
+            target_columns = ', '.join(
+                quote(target_meta.get_field(name).column) for name in names
+            )
+        sql = (
+            f'WITH inserted AS ('
+            f'INSERT INTO {quote(meta.db_table)} ({", ".join(columns)}) '
+            f'SELECT {", ".join(["%s"] * len(columns))} '
+            f'WHERE EXISTS (SELECT 1 FROM {quote(target_meta.db_table)} '
+            f'WHERE {quote(target_meta.pk.column)} = %s) '
+            f'ON CONFLICT DO NOTHING '
+            f'RETURNING {quote(meta.pk.column)}) '
+            f'SELECT {target_columns}, '
+            f'(SELECT {quote(meta.pk.column)} FROM inserted) '
+            f'AS relation_id FROM {quote(target_meta.db_table)} '
+            f'WHERE {quote(target_meta.pk.column)} = %s'
+        )
+        params = (*values.values(), values[target], values[target])
+        with transaction.atomic(using=self.db):
+            obj = next(iter(target_meta.model.objects.raw(sql, params)), None)
+            if obj is None:
+                raise target_meta.model.DoesNotExist(
+                    f'{target_meta.object_name} matching query does not exist.'
+                )
+            relation = self.model(
+                pk=obj.relation_id,
+                **{meta.get_field(name).attname: value
+                   for name, value in values.items()}
+            )
+            setattr(relation, target, obj)
+            created = obj.relation_id is not None
+            if created:
+                # The row bypassed save(), counters rely on this signal
+                post_save.send(
+                    sender=self.model, instance=relation, created=True,
+                    update_fields=None, raw=False, using=self.db
+                )
+        return relation, created
+
+    def add_many(self, target, target_ids, **values):
+        """
+        Links existing targets with one INSERT, skipping linked ones.
+        Returns ids of the newly linked targets.
+        """
+        meta = self.model._meta
+        quote = connection.ops.quote_name
+        target_column = quote(meta.get_field(target).column)
+        columns = [quote(meta.get_field(name).column) for name in values]
+        sql = (
+            f'INSERT INTO {quote(meta.db_table)} '
+            f'({", ".join(columns)}, {target_column}) '
+            f'SELECT {", ".join(["%s"] * len(columns))}, UNNEST(%s) '
+            f'ON CONFLICT DO NOTHING RETURNING {target_column}'
+        )
+        return self._execute_batch(
+            sql, (*values.values(), list(target_ids)), relations_added
+        )
+
+    def remove_many(self, target, target_ids, **values):
+        """
+        Unlinks targets with one DELETE, returns ids of the unlinked ones
+        """
+        meta = self.model._meta
+        quote = connection.ops.quote_name
+        target_column = quote(meta.get_field(target).column)
+        conditions = [
+            f'{quote(meta.get_field(name).column)} = %s' for name in values
+        ]
+        sql = (
+            f'DELETE FROM {quote(meta.db_table)} '
+            f'WHERE {" AND ".join(conditions)} '
+            f'AND {target_column} = ANY(%s) RETURNING {target_column}'
+        )
+        return self._execute_batch(
+            sql, (*values.values(), list(target_ids)), relations_removed
+        )
+
+    def _execute_batch(self, sql, params, signal):
+        with transaction.atomic(using=self.db):
+            with connections[self.db].cursor() as cursor:
+                cursor.execute(sql, params)
+                ids = [row[0] for row in cursor.fetchall()]
+            if ids:
+                signal.send(sender=self.model, ids=ids, using=self.db)
+        return ids
+
+
 class UserRecipeRelations(models.Model):
     """
     Base class for Favorite and ShoppingCart models
@@ -124,6 +424,8 @@ class UserRecipeRelations(models.Model):
         on_delete=models.CASCADE,
     )
 
+    objects = RelationQuerySet.as_manager()
+
     class Meta:
         constraints = (
             models.UniqueConstraint(
@@ -139,14 +441,14 @@ class UserRecipeRelations(models.Model):
 
 
 class FavoriteRecipe(UserRecipeRelations):
-    class Meta:
+    class Meta(UserRecipeRelations.Meta):
         verbose_name = 'Избранное'
         verbose_name_plural = 'Избранное'
         default_related_name = 'favorites'
 
 
 class ShoppingCart(UserRecipeRelations):
-    class Meta:
+    class Meta(UserRecipeRelations.Meta):
         verbose_name = 'Корзина покупок'
         verbose_name_plural = 'Корзина покупок'
         default_related_name = 'shopping_cart'
@@ -166,6 +468,8 @@ class Subscription(models.Model):
         related_name='subscription'
     )
 
+    objects = RelationQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
@@ -173,6 +477,45 @@ class Subscription(models.Model):
             models.UniqueConstraint(fields=('subscriber', 'author'),
                                     name='unique_subscriptions'),
         )
+        indexes = (
+            models.Index(fields=('subscriber', '-id'),
+                         name='subscription_subscriber_idx'),
+        )
 
     def __str__(self):
         return f'{self._meta.verbose_name} {self.subscriber} на {self.author}'
+
+
+class TableVersionManager(models.Manager):
+    def current(self, model):
+        """
+        Version of the table, read only. Until the first bump it is 0.
+        """
+        table = model._meta.label_lower
+        return self.filter(table=table).first() or self.model(table=table)
+
+    def bump(self, model):
+        table = model._meta.label_lower
+        updated = self.filter(table=table).update(
+            version=models.F('version') + 1, updated_at=timezone.now()
+        )
+        if not updated:
+            self.get_or_create(table=table, defaults={'version': 1})
+
+
+class TableVersion(models.Model):
+    """
+    Change counter of a table, used for conditional GET responses
+    """
+    table = models.CharField('Таблица', max_length=100, unique=True)
+    version = models.PositiveBigIntegerField('Версия', default=0)
+    updated_at = models.DateTimeField('Изменено', default=timezone.now)
+
+    objects = TableVersionManager()
+
+    class Meta:
+        verbose_name = 'Версия таблицы'
+        verbose_name_plural = 'Версии таблиц'
+
+    def __str__(self):
+        return f'{self.table} v{self.version}'
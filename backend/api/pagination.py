@@ -1,5 +1,36 @@
 from rest_framework import pagination
 
 
+class KeysetPagination(pagination.CursorPagination):
+    """
+    Cursor pagination over descending ids, without OFFSET and COUNT(*)
+    """
+    ordering = '-id'
+    page_size = 6
+    page_size_query_param = 'limit'
+    max_page_size = 100
+
+
 class BasePagination(pagination.PageNumberPagination):
+    """
+    Page number pagination, switched to keyset pagination when the request
+    has a cursor parameter (empty for the first page). Querysets ordered
+    otherwise than by descending ids, e.g. by search rank, stay on pages.
+    """
     page_size_query_param = 'limit'
+    cursor_query_param = KeysetPagination.cursor_query_param
+
+    def __init__(self):
+        self.keyset = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if (self.cursor_query_param in request.query_params
+                and queryset.query.order_by == (KeysetPagination.ordering,)):
+            self.keyset = KeysetPagination()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
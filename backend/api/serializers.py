@@ -1,20 +1,27 @@
 #  api/serializers.py
+from django.core.files.storage import default_storage
 from django.db import transaction
-from django.db.models import F
+from django.db.models import Prefetch, prefetch_related_objects
 from djoser.serializers import UserSerializer
-from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 
 from users.models import CustomUser
 
+from .fields import Base64ImageField
 from .models import (FavoriteRecipe, Ingredient, Recipe, RecipeIngredients,
                      ShoppingCart, Subscription, Tag)
 
+MAX_INGREDIENT_AMOUNT = 32767
+MAX_BATCH_SIZE = 100
+MAX_COOKABLE_INGREDIENTS = 100
+
 
 class CustomUserSerializer(UserSerializer):
     is_subscribed = serializers.SerializerMethodField()
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
         if request is None or request.user.is_anonymous:
             return False
@@ -42,11 +49,7 @@ class TagSerializer(serializers.ModelSerializer):
 
 
 class RecipeIngredientsSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(
-        source='ingredient',
-        queryset=Ingredient.objects.all().values_list(
-            'id', flat=True)
-    )
+    id = serializers.IntegerField(source='ingredient_id')
     name = serializers.ReadOnlyField(source='ingredient.name')
     measurement_unit = serializers.ReadOnlyField(
         source='ingredient.measurement_unit'
@@ -70,6 +73,8 @@ class RecipeSerializer(serializers.ModelSerializer):
     cooking_time = serializers.IntegerField(min_value=1)
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         request = self.context.get('request')
         if request is None or request.user.is_anonymous:
             return False
@@ -77,6 +82,8 @@ class RecipeSerializer(serializers.ModelSerializer):
             user=request.user.id, recipe=obj).exists()
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         request = self.context.get('request')
         if request is None or request.user.is_anonymous:
             return False
@@ -97,26 +104,65 @@ class RecipeSerializer(serializers.ModelSerializer):
         )
         return super(RecipeSerializer, self).to_internal_value(data)
 
+    def validate_ingredients(self, value):
+        amounts = {}
+        for ingredient in value:
+            ingredient_id = ingredient.get('ingredient_id')
+            amounts[ingredient_id] = (
+                amounts.get(ingredient_id, 0) + ingredient.get('amount')
+            )
+
+        found = set(Ingredient.objects.filter(
+            id__in=amounts
+        ).values_list('id', flat=True))
+        missing = sorted(amounts.keys() - found)
+        if missing:
+            raise serializers.ValidationError(
+                f'Ингредиенты не найдены: {missing}'
+            )
+
+        if any(amount > MAX_INGREDIENT_AMOUNT for amount in amounts.values()):
+            raise serializers.ValidationError(
+                f'Значение не может быть больше {MAX_INGREDIENT_AMOUNT}'
+            )
+
+        return [
+            {'ingredient_id': ingredient_id, 'amount': amount}
+            for ingredient_id, amount in amounts.items()
+        ]
+
     # noinspection PyMethodMayBeStatic
     def _set_ingredients(self, ingredients, recipe):
+        RecipeIngredients.objects.bulk_create(
+            RecipeIngredients(recipe=recipe, **ingredient)
+            for ingredient in ingredients
+        )
+
+    def _update_ingredients(self, ingredients, recipe):
+        """
+        Applies only the difference between stored and new ingredients
+        """
+        existing = {
+            row.ingredient_id: row
+            for row in RecipeIngredients.objects.filter(recipe=recipe)
+        }
+        to_create, to_update = [], []
         for ingredient in ingredients:
-            amount = ingredient.get('amount')
-            ingredient = ingredient.get('ingredient')
-
-            if RecipeIngredients.objects.filter(
-                    recipe=recipe, ingredient=ingredient
-            ).exists():
-                amount += F('amount')
-
-            if amount < 1:
-                raise serializers.ValidationError(
-                    'Значение не может быть меньше 1'
-                )
-
-            RecipeIngredients.objects.update_or_create(
-                recipe=recipe, ingredient_id=ingredient,
-                defaults={'amount': amount}
-            )
+            row = existing.pop(ingredient.get('ingredient_id'), None)
+            if row is None:
+                to_create.append(ingredient)
+            elif row.amount != ingredient.get('amount'):
+                row.amount = ingredient.get('amount')
+                to_update.append(row)
+
+        if existing:
+            RecipeIngredients.objects.filter(
+                id__in=[row.id for row in existing.values()]
+            ).delete()
+        if to_update:
+            RecipeIngredients.objects.bulk_update(to_update, ('amount',))
+        if to_create:
+            self._set_ingredients(to_create, recipe)
 
     @transaction.atomic
     def create(self, validated_data):
@@ -128,6 +174,11 @@ class RecipeSerializer(serializers.ModelSerializer):
         recipe.save()
         recipe.tags.set(tags)
         self._set_ingredients(ingredients, recipe)
+        Recipe.objects.filter(pk=recipe.pk).update_search_vector()
+        prefetch_related_objects([recipe], Prefetch(
+            'recipeingredients_set',
+            queryset=RecipeIngredients.objects.select_related('ingredient')
+        ))
 
         return recipe
 
@@ -145,28 +196,95 @@ class RecipeSerializer(serializers.ModelSerializer):
             tags = validated_data.pop('tags')
             instance.tags.set(tags)
 
-        if 'recipeingredients_set' in self.initial_data:
+        if 'recipeingredients_set' in validated_data:
             ingredients = validated_data.pop('recipeingredients_set')
-            RecipeIngredients.objects.filter(recipe=instance).delete()
-            self._set_ingredients(ingredients, instance)
+            self._update_ingredients(ingredients, instance)
 
+        Recipe.objects.filter(pk=instance.pk).update_search_vector()
         return instance
 
 
+class CookableRecipeSerializer(RecipeSerializer):
+    """
+    Recipe with the share of its ingredients the user has.
+    """
+    coverage = serializers.FloatField(read_only=True)
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ('coverage',)
+
+
 class RecipeMinifiedSerializer(serializers.ModelSerializer):
     """
     Class for minified Recipe representation.
     """
     image = serializers.SerializerMethodField(method_name='get_image')
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time',)
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time',)
 
     def get_image(self, obj):
         request = self.context.get('request')
         return request.build_absolute_uri(obj.image.url)
 
+    def get_image_variants(self, obj):
+        """
+        Resized copies of the image, empty until they are built
+        """
+        request = self.context.get('request')
+        if obj.image_variants.get('source') != obj.image.name:
+            return {}
+        return {
+            name: request.build_absolute_uri(default_storage.url(path))
+            for name, path in obj.image_variants.items()
+            if name != 'source'
+        }
+
+
+class RecipeBatchSerializer(serializers.Serializer):
+    """
+    Recipe ids for batch Favorite and ShoppingCart requests.
+    """
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=MAX_BATCH_SIZE,
+        error_messages={
+            'max_length': 'Не больше {max_length} рецептов за один запрос'
+        }
+    )
+
+    def validate_recipes(self, value):
+        ids = list(dict.fromkeys(value))
+        recipes = Recipe.objects.only(
+            'name', 'image', 'image_variants', 'cooking_time'
+        ).in_bulk(ids)
+        missing = [pk for pk in ids if pk not in recipes]
+        if missing:
+            raise serializers.ValidationError(
+                f'Рецепты не найдены: {", ".join(map(str, missing))}'
+            )
+        return [recipes[pk] for pk in ids]
+
+
+class IngredientSetSerializer(serializers.Serializer):
+    """
+    Ingredient ids the user has, for the cookable recipes search.
+    """
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=MAX_COOKABLE_INGREDIENTS,
+        error_messages={
+            'max_length': 'Не больше {max_length} ингредиентов за один запрос'
+        }
+    )
+
+    def validate_ingredients(self, value):
+        return list(set(value))
+
 
 class UserRecipeRelationsSerializer(serializers.ModelSerializer):
     """
@@ -231,7 +349,7 @@ class SubscriptionSerializer(serializers.ModelSerializer):
             instance=instance_recipes,
             context={'request': request}
         )
-        recipes_count = instance.author.recipes.count()
+        recipes_count = instance.author.recipes_count
 
         return {
             **author.data,
@@ -0,0 +1,82 @@
+import csv
+import json
+import tempfile
+
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import RecipeIngredients
+
+# Longer lists are spooled to disk instead of memory
+SPOOL_MAX_SIZE = 1024 * 1024
+
+
+class _Echo:
+    """
+    File-like object for csv.writer which returns a row instead of storing it
+    """
+    def write(self, value):
+        return value
+
+
+def get_shopping_list(user):
+    """
+    Ingredients of the user's shopping cart summed up in the database
+    """
+    return RecipeIngredients.objects.filter(
+        recipe__shopping_cart__user=user
+    ).values(
+        'ingredient__name', 'ingredient__measurement_unit'
+    ).annotate(
+        total=Sum('amount')
+    ).order_by(
+        'ingredient__name'
+    ).values_list(
+        'ingredient__name', 'total', 'ingredient__measurement_unit'
+    ).iterator()
+
+
+def render_txt(items):
+    yield f'Список покупок на {timezone.now().date()}\n\n'
+    for name, amount, measurement_unit in items:
+        yield f'{name}: {amount}{measurement_unit}\n'
+
+
+def render_csv(items):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(('name', 'amount', 'measurement_unit'))
+    for item in items:
+        yield writer.writerow(item)
+
+
+def render_json(items):
+    yield '['
+    separator = ''
+    for name, amount, measurement_unit in items:
+        yield separator + json.dumps({
+            'name': name,
+            'amount': amount,
+            'measurement_unit': measurement_unit,
+        }, ensure_ascii=False)
+        separator = ','
+    yield ']'
+
+
+def spool(chunks, max_size=SPOOL_MAX_SIZE):
+    """
+    Temporary file with the rendered list, kept in memory up to max_size
+    bytes. The rows are fetched here, so that the file can be sent from
+    any thread, the event loop of the ASGI handler included.
+    """
+    file = tempfile.SpooledTemporaryFile(max_size)
+    for chunk in chunks:
+        file.write(chunk.encode())
+    file.seek(0)
+    return file
+
+
+SHOPPING_LIST_FORMATS = {
+    'txt': ('text/plain', render_txt),
+    'csv': ('text/csv', render_csv),
+    'json': ('application/json', render_json),
+}
@@ -0,0 +1,172 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import forget_tokens
+from .caching import recipe_response_cache
+from .counters import change_counter
+from .images import delete_renditions, schedule_renditions
+from .models import (FavoriteRecipe, Ingredient, Recipe, RecipeIngredients,
+                     Subscription, TableVersion, Tag, relations_added,
+                     relations_removed)
+from .tag_cache import forget_tag_ids
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+@receiver((post_save, post_delete), sender=Tag)
+def reference_table_changed(sender, **kwargs):
+    TableVersion.objects.bump(sender)
+    transaction.on_commit(lambda: recipe_response_cache.bump('related'))
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tag_changed(**kwargs):
+    transaction.on_commit(forget_tag_ids)
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_renamed(instance, created, **kwargs):
+    if not created:
+        Recipe.objects.filter(
+            recipeingredients__ingredient=instance
+        ).update_search_vector()
+
+
+@receiver((post_save, post_delete), sender=settings.AUTH_USER_MODEL)
+def author_changed(update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    transaction.on_commit(lambda: recipe_response_cache.bump('related'))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_tokens_changed(instance, created, update_fields=None, **kwargs):
+    if created:
+        return
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    # After the commit, so that a concurrent request can't cache the old
+    # user again between the eviction and the commit
+    transaction.on_commit(lambda: forget_tokens(
+        Token.objects.filter(user=instance).values_list('key', flat=True)
+    ))
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(instance, **kwargs):
+    key = instance.key
+    transaction.on_commit(lambda: forget_tokens([key]))
+
+
+def invalidate_recipe(recipe_id):
+    def bump():
+        recipe_response_cache.bump(f'detail:{recipe_id}')
+        recipe_response_cache.bump('list')
+    transaction.on_commit(bump)
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def recipe_changed(instance, **kwargs):
+    invalidate_recipe(instance.pk)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_changed(instance, **kwargs):
+    if instance.image and (
+        instance.image_variants.get('source') != instance.image.name
+    ):
+        schedule_renditions(instance)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(instance, **kwargs):
+    variants = instance.image_variants
+    transaction.on_commit(lambda: delete_renditions(variants))
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredients)
+def recipe_ingredients_changed(instance, **kwargs):
+    invalidate_recipe(instance.recipe_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        invalidate_recipe(instance.pk)
+        return
+    for recipe_id in pk_set or ():
+        invalidate_recipe(recipe_id)
+    if action == 'post_clear':
+        transaction.on_commit(lambda: recipe_response_cache.bump('related'))
+
+
+def _delta(signal, created=False):
+    if signal is post_delete:
+        return -1
+    return 1 if created else 0
+
+
+@receiver((post_save, post_delete), sender=FavoriteRecipe)
+def favorites_count_changed(signal, instance, created=False, **kwargs):
+    delta = _delta(signal, created)
+    if delta:
+        change_counter(
+            Recipe.objects.filter(pk=instance.recipe_id),
+            'favorites_count', delta
+        )
+
+
+@receiver((relations_added, relations_removed), sender=FavoriteRecipe)
+def favorites_count_changed_in_bulk(signal, ids, **kwargs):
+    delta = 1 if signal is relations_added else -1
+    change_counter(
+        Recipe.objects.filter(pk__in=ids), 'favorites_count', delta
+    )
+
+
+@receiver(pre_save, sender=Recipe)
+def recipe_author_stored(instance, update_fields=None, **kwargs):
+    """
+    Remembers the stored author, so that a reassignment moves the counter
+    """
+    instance._stored_author_id = None
+    if instance.pk is None or (
+        update_fields is not None and 'author' not in update_fields
+    ):
+        return
+    instance._stored_author_id = Recipe.objects.filter(
+        pk=instance.pk
+    ).values_list('author_id', flat=True).first()
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def recipes_count_changed(signal, instance, created=False, **kwargs):
+    users = get_user_model().objects
+    delta = _delta(signal, created)
+    if delta:
+        change_counter(
+            users.filter(pk=instance.author_id), 'recipes_count', delta
+        )
+        return
+    previous = getattr(instance, '_stored_author_id', None)
+    if previous is not None and previous != instance.author_id:
+        change_counter(users.filter(pk=previous), 'recipes_count', -1)
+        change_counter(
+            users.filter(pk=instance.author_id), 'recipes_count', 1
+        )
+
+
+@receiver((post_save, post_delete), sender=Subscription)
+def subscribers_count_changed(signal, instance, created=False, **kwargs):
+    delta = _delta(signal, created)
+    if delta:
+        change_counter(
+            get_user_model().objects.filter(pk=instance.author_id),
+            'subscribers_count', delta
+        )
@@ -0,0 +1,43 @@
+import threading
+import time
+
+from django.conf import settings
+
+from .models import TableVersion, Tag
+
+_tag_ids = (None, float('-inf'), {})
+_lock = threading.Lock()
+
+
+def get_tag_ids():
+    """
+    Process-wide slug to id map. The tag table version is checked at most
+    every TAG_CACHE_CHECK_INTERVAL seconds, the map is reloaded when it
+    changed.
+    """
+    global _tag_ids
+    version, checked_at, tag_ids = _tag_ids
+    if time.monotonic() - checked_at < settings.TAG_CACHE_CHECK_INTERVAL:
+        return tag_ids
+    with _lock:
+        version, checked_at, tag_ids = _tag_ids
+        now = time.monotonic()
+        if now - checked_at >= settings.TAG_CACHE_CHECK_INTERVAL:
+            current = TableVersion.objects.filter(
+                table=Tag._meta.label_lower
+            ).values_list('version', flat=True).first() or 0
+            if current != version:
+                tag_ids = dict(
+                    Tag.objects.exclude(slug=None).values_list('slug', 'id')
+                )
+            _tag_ids = (current, now, tag_ids)
+    return tag_ids
+
+
+def forget_tag_ids():
+    """
+    Makes the next call reload the map, for tag changes of this process
+    """
+    global _tag_ids
+    with _lock:
+        _tag_ids = (None, float('-inf'), {})
@@ -0,0 +1,74 @@
+import pytest
+from django.core.cache import caches
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.models import Ingredient, Recipe, RecipeIngredients, Tag
+from api.tag_cache import forget_tag_ids
+from users.models import CustomUser
+
+IMAGE = 'recipe_images/test.png'
+
+
+def create_user(number):
+    return CustomUser.objects.create_user(
+        'Имя', 'Фамилия', f'user_{number}', f'user_{number}@example.com',
+        'password'
+    )
+
+
+def create_recipes(count, author, ingredients=3):
+    """
+    Recipes with ingredients and a tag, inserted in bulk
+    """
+    tag, _ = Tag.objects.get_or_create(slug='tag', defaults={'name': 'Тэг'})
+    ingredient_list = [
+        Ingredient.objects.get_or_create(name=f'Ингредиент {number}')[0]
+        for number in range(ingredients)
+    ]
+    recipes = Recipe.objects.bulk_create([
+        Recipe(
+            author=author, name=f'Рецепт {number}', text='Описание',
+            cooking_time=10, image=IMAGE,
+            # A matching source keeps renditions from being scheduled
+            image_variants={'source': IMAGE},
+        ) for number in range(count)
+    ])
+    RecipeIngredients.objects.bulk_create([
+        RecipeIngredients(recipe=recipe, ingredient=ingredient, amount=1)
+        for recipe in recipes
+        for ingredient in ingredient_list
+    ])
+    Recipe.tags.through.objects.bulk_create([
+        Recipe.tags.through(recipe=recipe, tag=tag) for recipe in recipes
+    ])
+    return recipes
+
+
+def authenticated_client(user):
+    """
+    Client sending the user's token. The first request caches the token,
+    so that later ones issue only the queries of the view.
+    """
+    token, _ = Token.objects.get_or_create(user=user)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    assert client.get('/api/users/me/').status_code == 200
+    return client
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    for cache in caches.all():
+        cache.clear()
+    forget_tag_ids()
+
+
+@pytest.fixture
+def user(db):
+    return create_user(0)
+
+
+@pytest.fixture
+def api_client(user):
+    return authenticated_client(user)
@@ -0,0 +1,27 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .conftest import authenticated_client
+
+
+def test_token_lookup_is_cached(user):
+    client = authenticated_client(user)
+    with CaptureQueriesContext(connection) as context:
+        assert client.get('/api/users/me/').status_code == 200
+    # Only the view itself reads the user
+    assert len(context) == 1
+
+
+def test_deactivated_user_is_forgotten_after_commit(
+    user, django_capture_on_commit_callbacks
+):
+    client = authenticated_client(user)
+    with django_capture_on_commit_callbacks(execute=False) as callbacks:
+        user.is_active = False
+        user.save()
+    # Not committed yet, the cached snapshot is still served
+    assert client.get('/api/users/me/').status_code == 200
+
+    for callback in callbacks:
+        callback()
+    assert client.get('/api/users/me/').status_code == 401
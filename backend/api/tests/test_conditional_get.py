@@ -0,0 +1,36 @@
+from api.models import TableVersion, Tag
+
+
+def test_etag_depends_on_accept(client, db):
+    json = client.get('/api/tags/', HTTP_ACCEPT='application/json')
+    assert json.status_code == 200
+    assert 'Accept' in json['Vary']
+
+    assert client.get(
+        '/api/tags/', HTTP_ACCEPT='application/json',
+        HTTP_IF_NONE_MATCH=json['ETag'],
+    ).status_code == 304
+    html = client.get(
+        '/api/tags/', HTTP_ACCEPT='text/html', HTTP_IF_NONE_MATCH=json['ETag']
+    )
+    assert html.status_code == 200
+    assert html['ETag'] != json['ETag']
+
+
+def test_conditional_get_does_not_write(client, db):
+    TableVersion.objects.all().delete()
+
+    client.get('/api/tags/')
+    client.get('/api/ingredients/')
+
+    assert not TableVersion.objects.exists()
+
+
+def test_etag_changes_with_tags(client, db):
+    etag = client.get('/api/tags/')['ETag']
+
+    Tag.objects.create(name='Завтрак', color='#E26C2D', slug='breakfast')
+
+    assert client.get(
+        '/api/tags/', HTTP_IF_NONE_MATCH=etag
+    ).status_code == 200
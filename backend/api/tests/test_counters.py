@@ -0,0 +1,53 @@
+from api.models import FavoriteRecipe, Recipe, Subscription
+from api.serializers import RecipeSerializer
+from users.models import CustomUser
+
+from .conftest import IMAGE, create_recipes, create_user
+
+
+def test_recipes_count_follows_reassigned_author(user):
+    other = create_user(1)
+    recipe = Recipe.objects.create(
+        author=user, name='Рецепт', text='Описание', image=IMAGE,
+        image_variants={'source': IMAGE}
+    )
+    user.refresh_from_db()
+    assert user.recipes_count == 1
+
+    recipe.author = other
+    recipe.save()
+    recipe.name = 'Другое название'
+    recipe.save()
+    user.refresh_from_db()
+    other.refresh_from_db()
+    assert (user.recipes_count, other.recipes_count) == (0, 1)
+
+    recipe.delete()
+    other.refresh_from_db()
+    assert other.recipes_count == 0
+
+
+def test_recipe_update_keeps_concurrent_favorite(user):
+    recipe, = create_recipes(1, create_user(1))
+    stale = Recipe.objects.get(pk=recipe.pk)
+    FavoriteRecipe.objects.add('recipe', user=user.pk, recipe=recipe.pk)
+
+    serializer = RecipeSerializer(stale, data={}, partial=True)
+    serializer.update(stale, {'name': 'Новое название'})
+
+    recipe.refresh_from_db()
+    assert (recipe.name, recipe.favorites_count) == ('Новое название', 1)
+
+
+def test_password_change_keeps_concurrent_subscription(user):
+    stale = CustomUser.objects.get(pk=user.pk)
+    Subscription.objects.add(
+        'author', subscriber=create_user(1).pk, author=user.pk
+    )
+
+    stale.set_password('new password')
+    stale.save()
+
+    user.refresh_from_db()
+    assert user.check_password('new password')
+    assert user.subscribers_count == 1
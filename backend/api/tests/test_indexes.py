@@ -0,0 +1,66 @@
+import io
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+
+from api.models import (FavoriteRecipe, Recipe, RecipeIngredients,
+                        ShoppingCart, Subscription)
+
+
+@pytest.fixture
+def seeded(db, settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    call_command(
+        'generate_data', recipes=5000, users=500, subscriptions_per_user=100,
+        seed=0, stdout=io.StringIO()
+    )
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def leading_indexes(model, column):
+    """
+    Indexes and unique constraints of the model starting with the column
+    """
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(
+            cursor, model._meta.db_table
+        )
+    return [
+        name for name, constraint in constraints.items()
+        if (constraint['index'] or constraint['unique'])
+        and constraint['columns'][:1] == [column]
+    ]
+
+
+def assert_uses_index(queryset, *indexes):
+    plan = queryset.explain()
+    assert any(index in plan for index in indexes), plan
+
+
+def test_hot_queries_use_indexes(seeded):
+    user_id = FavoriteRecipe.objects.values_list('user', flat=True)[0]
+    author_id = Recipe.objects.values_list('author', flat=True)[0]
+
+    assert_uses_index(
+        Recipe.objects.filter(author=author_id).order_by('-id')[:6],
+        'recipe_author_id_idx'
+    )
+    assert_uses_index(
+        Subscription.objects.filter(subscriber=user_id).order_by('-id')[:6],
+        'subscription_subscriber_idx'
+    )
+    # Served by the (user, recipe) constraint or the foreign key index
+    favorites = leading_indexes(FavoriteRecipe, 'user_id')
+    assert 'api_favoriterecipe_is_unique' in favorites
+    assert_uses_index(
+        Recipe.objects.filter(favorites__user=user_id).order_by('-id'),
+        *favorites
+    )
+    cart = leading_indexes(ShoppingCart, 'user_id')
+    assert 'api_shoppingcart_is_unique' in cart
+    assert_uses_index(
+        RecipeIngredients.objects.filter(recipe__shopping_cart__user=user_id),
+        *cart
+    )
@@ -0,0 +1,84 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient, RequestFactory
+from rest_framework.authtoken.models import Token
+
+from api.async_views import read_in_pool
+from api.metrics import (METRICS, Histograms, QueryRecorder, current_recorder,
+                         histograms)
+from api.views import TagViewSet
+
+
+def test_sql_of_shared_thread_view_recorded_over_asgi(user, monkeypatch):
+    monkeypatch.setattr(histograms, 'data', {name: {} for name in METRICS})
+    token, _ = Token.objects.get_or_create(user=user)
+
+    async def request():
+        return await AsyncClient().get(
+            '/api/users/me/', authorization=f'Token {token.key}'
+        )
+
+    assert async_to_sync(request)().status_code == 200
+    (key, series), = histograms.data['db_queries'].items()
+    assert key.endswith('.me GET')
+    assert series['sum'] > 0
+
+
+def exited_pid():
+    process = subprocess.Popen((sys.executable, '-c', ''))
+    process.wait()
+    return process.pid
+
+
+def total_count(worker):
+    series = worker.collect()['request_duration_seconds']['View GET']
+    return sum(series['buckets'])
+
+
+def test_dumps_of_exited_workers_are_kept(tmp_path):
+    exited = Histograms(str(tmp_path))
+    exited.observe('View', 'GET', request_duration_seconds=0.1)
+    os.rename(exited.path, tmp_path / f'{exited_pid()}.json')
+    worker = Histograms(str(tmp_path))
+    worker.observe('View', 'GET', request_duration_seconds=0.1)
+
+    assert total_count(worker) == 2
+    assert total_count(worker) == 2
+    assert sorted(os.listdir(tmp_path)) == [
+        '.lock', f'{os.getpid()}.json', 'retired.json'
+    ]
+
+
+def test_dump_of_reused_pid_is_retired(tmp_path):
+    previous = Histograms(str(tmp_path))
+    previous.observe('View', 'GET', request_duration_seconds=0.1)
+    worker = Histograms(str(tmp_path))
+    worker.observe('View', 'GET', request_duration_seconds=0.1)
+
+    assert total_count(worker) == 2
+
+
+@pytest.mark.django_db(transaction=True)
+def test_sql_of_concurrent_pooled_views_recorded_apart():
+    view = read_in_pool(TagViewSet.as_view({'get': 'list'}))
+
+    async def request(recorder):
+        current_recorder.set(recorder)
+        return await view(RequestFactory().get('/api/tags/'))
+
+    async def requests(*recorders):
+        return await asyncio.gather(*map(request, recorders))
+
+    alone = QueryRecorder()
+    async_to_sync(requests)(alone)
+    first, second = QueryRecorder(), QueryRecorder()
+    responses = async_to_sync(requests)(first, second)
+
+    assert [response.status_code for response in responses] == [200, 200]
+    assert alone.count > 0
+    assert first.count == second.count == alone.count
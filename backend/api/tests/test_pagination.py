@@ -0,0 +1,44 @@
+from api.models import Recipe
+
+from .conftest import create_recipes, create_user
+
+
+def get_ids(client, url, params):
+    response = client.get(url, params)
+    assert response.status_code == 200
+    return [recipe['id'] for recipe in response.json()['results']]
+
+
+def test_cursor_pages_follow_ids(api_client):
+    recipes = create_recipes(5, create_user(1))
+    ids = get_ids(api_client, '/api/recipes/', {'cursor': '', 'limit': 3})
+    assert ids == [recipe.id for recipe in reversed(recipes)][:3]
+
+
+def test_cursor_keeps_search_rank_order(api_client):
+    recipes = create_recipes(3, create_user(1))
+    Recipe.objects.filter(pk=recipes[0].pk).update(name='Суп суп')
+    Recipe.objects.filter(pk=recipes[1].pk).update(name='Суп')
+    Recipe.objects.update_search_vector()
+
+    params = {'search': 'суп', 'limit': 10}
+    ranked = get_ids(api_client, '/api/recipes/', params)
+    assert ranked == [recipes[0].id, recipes[1].id]
+    assert get_ids(
+        api_client, '/api/recipes/', {**params, 'cursor': ''}
+    ) == ranked
+
+
+def test_cursor_keeps_cookable_coverage_order(api_client):
+    recipes = create_recipes(2, create_user(1), ingredients=2)
+    recipes[0].recipeingredients_set.filter(
+        ingredient__name='Ингредиент 1'
+    ).delete()
+    ingredient_id = recipes[0].recipeingredients_set.get().ingredient_id
+
+    params = {'ingredients': ingredient_id, 'limit': 10}
+    covered = get_ids(api_client, '/api/recipes/cookable/', params)
+    assert covered == [recipes[0].id, recipes[1].id]
+    assert get_ids(
+        api_client, '/api/recipes/cookable/', {**params, 'cursor': ''}
+    ) == covered
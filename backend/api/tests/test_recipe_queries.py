@@ -0,0 +1,27 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .conftest import create_recipes, create_user
+
+
+def get_recipes(client):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get('/api/recipes/', {'limit': 500})
+    assert response.status_code == 200
+    return len(context), response.json()['results']
+
+
+def test_recipe_list_query_count_does_not_depend_on_page_size(api_client):
+    author = create_user(1)
+    create_recipes(10, author)
+    # Fills the process-wide tag map, so it is not counted below
+    get_recipes(api_client)
+    queries, recipes = get_recipes(api_client)
+    assert len(recipes) == 10
+
+    create_recipes(490, author)
+    more_queries, recipes = get_recipes(api_client)
+    assert len(recipes) == 500
+    assert all(len(recipe['ingredients']) == 3 for recipe in recipes)
+    assert all(len(recipe['tags']) == 1 for recipe in recipes)
+    assert more_queries == queries
@@ -0,0 +1,67 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from django.db import connection
+from rest_framework.test import APIClient
+
+from api.counters import reconcile_counters
+from api.models import FavoriteRecipe, Subscription
+from api.views import SubscribeAPIView
+
+from .conftest import create_recipes, create_user
+
+THREADS = 16
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_favorite_is_added_once():
+    user = create_user(1)
+    recipe = create_recipes(1, create_user(2))[0]
+    barrier = threading.Barrier(THREADS)
+
+    def add():
+        client = APIClient()
+        client.force_authenticate(user)
+        barrier.wait()
+        try:
+            return client.get(f'/api/recipes/{recipe.id}/favorite/')
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(THREADS) as executor:
+        responses = list(executor.map(lambda _: add(), range(THREADS)))
+
+    statuses = sorted(response.status_code for response in responses)
+    assert statuses == [201] + [400] * (THREADS - 1)
+    assert FavoriteRecipe.objects.filter(user=user, recipe=recipe).count() == 1
+    recipe.refresh_from_db()
+    assert recipe.favorites_count == 1
+
+
+def test_added_relation_loads_only_given_fields(user):
+    recipe = create_recipes(1, create_user(1))[0]
+
+    favorite, _ = FavoriteRecipe.objects.add(
+        'recipe', only=('name',), user=user.pk, recipe=recipe.pk
+    )
+    subscription, _ = Subscription.objects.add(
+        'author', only=SubscribeAPIView.author_fields,
+        subscriber=user.pk, author=recipe.author_id
+    )
+
+    assert {'text', 'search_vector'} <= favorite.recipe.get_deferred_fields()
+    assert 'password' in subscription.author.get_deferred_fields()
+
+
+def test_subscribe_response(user, api_client):
+    author = create_user(1)
+    create_recipes(2, author)
+    reconcile_counters()
+
+    response = api_client.get(f'/api/users/{author.id}/subscribe/')
+
+    assert response.status_code == 201
+    assert response.data['username'] == author.username
+    assert response.data['recipes_count'] == 2
+    assert len(response.data['recipes']) == 2
@@ -0,0 +1,20 @@
+from api.caching import recipe_response_cache
+from api.models import Tag
+
+from .conftest import create_recipes
+
+
+def test_clearing_tag_recipes_bumps_after_commit(
+    user, django_capture_on_commit_callbacks
+):
+    create_recipes(2, user)
+    tag = Tag.objects.get(slug='tag')
+    before, = recipe_response_cache.generations('related')
+
+    with django_capture_on_commit_callbacks() as callbacks:
+        tag.recipes.clear()
+        assert recipe_response_cache.generations('related') == [before]
+
+    for callback in callbacks:
+        callback()
+    assert recipe_response_cache.generations('related') != [before]
@@ -0,0 +1,63 @@
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from rest_framework.authtoken.models import Token
+
+from api.models import Ingredient, ShoppingCart
+from api.shopping_list import spool
+
+from .conftest import create_recipes, create_user
+
+
+def download_over_asgi(user, file_format):
+    """
+    Reads the body inside the event loop, as Django's ASGI handler does
+    """
+    token, _ = Token.objects.get_or_create(user=user)
+
+    async def download():
+        response = await AsyncClient().get(
+            '/api/recipes/download_shopping_cart/',
+            {'file_format': file_format},
+            authorization=f'Token {token.key}',
+        )
+        if response.streaming:
+            return response, b''.join(response.streaming_content)
+        return response, response.content
+
+    return async_to_sync(download)()
+
+
+def test_shopping_list_downloads_over_asgi(user):
+    for recipe in create_recipes(2, create_user(1)):
+        ShoppingCart.objects.create(user=user, recipe=recipe)
+
+    response, content = download_over_asgi(user, 'txt')
+    assert response.status_code == 200
+    lines = content.decode().splitlines()
+    assert lines[0].startswith('Список покупок')
+    unit = Ingredient.objects.get(name='Ингредиент 0').measurement_unit
+    assert f'Ингредиент 0: 2{unit}' in lines
+
+
+def test_shopping_list_downloads_over_wsgi(user, api_client):
+    for recipe in create_recipes(2, create_user(1)):
+        ShoppingCart.objects.create(user=user, recipe=recipe)
+
+    response = api_client.get(
+        '/api/recipes/download_shopping_cart/', {'file_format': 'csv'}
+    )
+
+    assert response.status_code == 200
+    assert response['Content-Disposition'] == (
+        'attachment; filename="shopping_list.csv"'
+    )
+    rows = b''.join(response.streaming_content).decode().splitlines()
+    assert rows[0] == 'name,amount,measurement_unit'
+    assert len(rows) == 4
+
+
+def test_long_shopping_list_spooled_to_disk():
+    file = spool(['строка\n'] * 100, max_size=64)
+
+    assert file._rolled
+    assert file.read().decode() == 'строка\n' * 100
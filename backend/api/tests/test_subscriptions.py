@@ -0,0 +1,35 @@
+import pytest
+
+from api.models import Subscription
+
+from .conftest import create_recipes, create_user
+
+FEED_QUERIES = 4
+
+
+@pytest.mark.parametrize('authors', (5, 50))
+def test_feed_query_count_does_not_depend_on_authors(
+    api_client, user, django_assert_num_queries, authors
+):
+    for number in range(1, authors + 1):
+        author = create_user(number)
+        create_recipes(5, author)
+        Subscription.objects.create(subscriber=user, author=author)
+
+    # COUNT, the page, its authors and their limited recipes
+    with django_assert_num_queries(FEED_QUERIES):
+        response = api_client.get(
+            '/api/users/subscriptions/', {'limit': 50, 'recipes_limit': 3}
+        )
+    assert response.status_code == 200
+    feed = response.json()['results']
+    assert len(feed) == authors
+    assert all(len(author['recipes']) == 3 for author in feed)
+
+
+def test_empty_feed_with_recipes_limit(api_client):
+    response = api_client.get(
+        '/api/users/subscriptions/', {'recipes_limit': 3}
+    )
+    assert response.status_code == 200
+    assert response.json() == []
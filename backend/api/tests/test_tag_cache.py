@@ -0,0 +1,41 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.models import Tag
+from api.tag_cache import get_tag_ids
+
+
+def test_tag_version_checked_once_per_interval(
+    db, settings, django_assert_num_queries
+):
+    settings.TAG_CACHE_CHECK_INTERVAL = 60
+    get_tag_ids()
+
+    with django_assert_num_queries(0):
+        get_tag_ids()
+
+    settings.TAG_CACHE_CHECK_INTERVAL = 0
+    # Version only, the map is kept while it is the same
+    with django_assert_num_queries(1):
+        get_tag_ids()
+
+
+def test_tag_change_resets_map_after_commit(
+    db, settings, django_capture_on_commit_callbacks
+):
+    settings.TAG_CACHE_CHECK_INTERVAL = 60
+    assert get_tag_ids() == {}
+
+    with django_capture_on_commit_callbacks(execute=True):
+        tag = Tag.objects.create(name='Обед', color='#49B64E', slug='lunch')
+
+    assert get_tag_ids() == {'lunch': tag.id}
+
+
+def test_recipe_list_does_not_write(api_client):
+    with CaptureQueriesContext(connection) as queries:
+        assert api_client.get('/api/recipes/').status_code == 200
+
+    assert not [
+        query for query in queries if not query['sql'].startswith('SELECT')
+    ]
@@ -1,10 +1,13 @@
 #  api/urls.py
+from django.conf import settings
 from django.urls import path
 from rest_framework import routers
 
-from .views import (FavoriteAPIView, IngredientViewSet, RecipeViewSet,
-                    ShoppingCartAPIView, SubscribeAPIView, SubscriptionsView,
-                    TagViewSet)
+from .async_views import read_in_pool_patterns
+from .views import (FavoriteAPIView, FavoriteBatchAPIView, IngredientViewSet,
+                    MetricsView, RecipeViewSet, ShoppingCartAPIView,
+                    ShoppingCartBatchAPIView, SubscribeAPIView,
+                    SubscriptionsView, TagViewSet)
 
 router_v1 = routers.DefaultRouter()
 router_v1.register('ingredients', IngredientViewSet, basename='ingredients')
@@ -12,6 +15,16 @@ router_v1.register('tags', TagViewSet, basename='tags')
 router_v1.register('recipes', RecipeViewSet, basename='recipes')
 
 urlpatterns = [
+    path(
+        'recipes/favorite/',
+        FavoriteBatchAPIView.as_view(),
+        name='favorite_batch'
+    ),
+    path(
+        'recipes/shopping_cart/',
+        ShoppingCartBatchAPIView.as_view(),
+        name='shopping_cart_batch'
+    ),
     path(
         'recipes/<int:pk>/favorite/',
         FavoriteAPIView.as_view(),
@@ -27,7 +40,13 @@ urlpatterns = [
         SubscribeAPIView.as_view(),
         name='subscription'
     ),
-    path('users/subscriptions/', SubscriptionsView.as_view(),)
+    path('users/subscriptions/', SubscriptionsView.as_view(),),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
 ]
 
-urlpatterns += router_v1.urls
+if settings.ASYNC_READ_VIEWS:
+    urlpatterns += read_in_pool_patterns(
+        router_v1.urls, (IngredientViewSet, RecipeViewSet, TagViewSet)
+    )
+else:
+    urlpatterns += router_v1.urls
@@ -1,39 +1,96 @@
 #  api/views.py
 import django_filters
-from django.db.models import Sum
-from django.shortcuts import HttpResponse
-from django.utils import timezone
+from django.db.models import (BooleanField, Exists, OuterRef, Prefetch, Value,
+                              prefetch_related_objects)
+from django.http import FileResponse, Http404, HttpResponse
 from rest_framework import mixins, permissions, response, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.generics import GenericAPIView, get_object_or_404
+from rest_framework.relations import PrimaryKeyRelatedField
 from rest_framework.views import APIView
 
-from .models import (FavoriteRecipe, Ingredient, Recipe, RecipeIngredients,
+from users.models import CustomUser
+
+from .caching import (AnonymousResponseCacheMixin, ConditionalGetMixin,
+                      recipe_response_cache)
+from .ingredient_cache import get_catalogue
+from .metrics import histograms
+from .models import (FavoriteRecipe, Ingredient, IngredientQuerySet, Recipe,
                      ShoppingCart, Subscription, Tag)
 from .permissions import IsAuthorOrAdminOrReadOnly
-from .serializers import (FavoriteRecipeSerializer, IngredientSerializer,
-                          RecipeIngredientsSerializer, RecipeSerializer,
+from .serializers import (CookableRecipeSerializer, FavoriteRecipeSerializer,
+                          IngredientSerializer, IngredientSetSerializer,
+                          RecipeBatchSerializer, RecipeIngredientsSerializer,
+                          RecipeMinifiedSerializer, RecipeSerializer,
                           ShoppingCartSerializer, SubscriptionSerializer,
                           TagSerializer)
+from .shopping_list import SHOPPING_LIST_FORMATS, get_shopping_list, spool
+from .tag_cache import get_tag_ids
+
+
+def does_not_exist(field, pk):
+    """
+    The same error PrimaryKeyRelatedField reports for an unknown object
+    """
+    message = PrimaryKeyRelatedField.default_error_messages['does_not_exist']
+    return ValidationError({field: [message.format(pk_value=pk)]})
 
 
-class TagFilter(django_filters.FilterSet):
+class RecipeFilter(django_filters.FilterSet):
     """
-    Filtering against query parameters tags
+    Filtering against query parameters tags, tags_mode and search
     """
-    tags = django_filters.AllValuesMultipleFilter(
-        field_name='tags__slug',
+    TAGS_MODES = (
+        ('any', 'Любой из тэгов'),
+        ('all', 'Все тэги'),
     )
 
+    tags = django_filters.MultipleChoiceFilter(method='filter_tags')
+    tags_mode = django_filters.ChoiceFilter(
+        choices=TAGS_MODES, method='filter_tags_mode'
+    )
+    search = django_filters.CharFilter(method='filter_search')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tag_ids = get_tag_ids()
+        self.filters['tags'].extra['choices'] = [
+            (slug, slug) for slug in self.tag_ids
+        ]
+
+    def filter_tags(self, queryset, name, value):
+        """
+        EXISTS per tag in all mode, a single EXISTS in any mode,
+        so that recipes are not repeated
+        """
+        ids = [self.tag_ids[slug] for slug in value]
+        groups = [ids]
+        if self.form.cleaned_data.get('tags_mode') == 'all':
+            groups = [[tag_id] for tag_id in ids]
+        tagged = Recipe.tags.through.objects.filter(recipe=OuterRef('pk'))
+        for group in groups:
+            queryset = queryset.filter(Exists(tagged.filter(tag__in=group)))
+        return queryset
+
+    # noinspection PyMethodMayBeStatic
+    def filter_tags_mode(self, queryset, name, value):
+        return queryset
+
+    # noinspection PyMethodMayBeStatic
+    def filter_search(self, queryset, name, value):
+        return queryset.search(value)
+
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(AnonymousResponseCacheMixin, viewsets.ModelViewSet):
     serializer_class = RecipeSerializer
-    filterset_class = TagFilter
+    response_cache = recipe_response_cache
+    filterset_class = RecipeFilter
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
 
     def get_queryset(self):
-        queryset = Recipe.objects.all()
         user = self.request.user
+        queryset = Recipe.objects.with_user_flags(user).with_related(user)
         is_favorited = self.request.query_params.get('is_favorited')
         is_in_shopping = self.request.query_params.get('is_in_shopping_cart')
         author = self.request.query_params.get('author')
@@ -49,39 +106,92 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         return queryset.order_by('-id')
 
-    @action(detail=False, permission_classes=(IsAuthorOrAdminOrReadOnly,))
+    @action(detail=False)
+    def cookable(self, request):
+        """
+        Recipes that can be cooked from the given ingredients
+        """
+        ingredients = IngredientSetSerializer(data={
+            'ingredients': request.query_params.getlist('ingredients')
+        })
+        ingredients.is_valid(raise_exception=True)
+        queryset = self.filter_queryset(self.get_queryset()).with_coverage(
+            ingredients.validated_data['ingredients']
+        )
+
+        page = self.paginate_queryset(queryset)
+        recipes = queryset if page is None else page
+        serializer = CookableRecipeSerializer(
+            recipes, many=True, context=self.get_serializer_context()
+        )
+        if page is None:
+            return response.Response(serializer.data)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, permission_classes=(permissions.IsAuthenticated,))
     def download_shopping_cart(self, request):
-        user = request.user
-        cart = RecipeIngredients.objects.filter(
-            recipe__shopping_cart__user=user
-        ).annotate(_amount=Sum('amount')).values_list(
-            'ingredient__name', '_amount', 'ingredient__measurement_unit',
+        file_format = request.query_params.get('file_format', 'txt')
+
+        if file_format not in SHOPPING_LIST_FORMATS:
+            formats = ', '.join(SHOPPING_LIST_FORMATS)
+            return response.Response(
+                f'Ошибка: Доступные форматы: {formats}',
+                status.HTTP_400_BAD_REQUEST
+            )
+
+        content_type, render = SHOPPING_LIST_FORMATS[file_format]
+        return FileResponse(
+            spool(render(get_shopping_list(request.user))),
+            as_attachment=True,
+            filename=f'shopping_list.{file_format}',
+            content_type=f'{content_type}; charset=utf-8',
         )
-        data = [f'Список покупок на {timezone.now().date()}\n\n']
-        for item in cart:
-            data.append(f'{item[0]}: {item[1]}{item[2]}\n')
-        return HttpResponse(data, {
-            'content_type': 'text/plain',
-            'Content-Disposition': 'attachment; filename="shopping_list.txt"'
-        })
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = IngredientSerializer
     pagination_class = None
+    versioned_model = Ingredient
+    autocomplete_limit = 20
+    autocomplete_max_limit = 100
+
+    def get_autocomplete_limit(self):
+        try:
+            limit = int(self.request.query_params['limit'])
+        except (KeyError, ValueError):
+            return self.autocomplete_limit
+        return min(max(limit, 1), self.autocomplete_max_limit)
 
     def get_queryset(self):
         name = self.request.query_params.get('name', None)
         queryset = Ingredient.objects.all()
 
-        if name:
-            queryset = queryset.filter(name__istartswith=name).distinct('name')
+        if name and self.action == 'list':
+            limit = self.get_autocomplete_limit()
+            queryset = queryset.autocomplete(name)[:limit]
 
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name', None)
+
+        if name:
+            limit = self.get_autocomplete_limit()
+            catalogue = get_catalogue(self.table_version.version)
+            start, end = catalogue.prefix_range(name)
+            prefix_only = len(name) < IngredientQuerySet.TRIGRAM_MIN_LENGTH
+            if prefix_only or end - start >= limit:
+                return HttpResponse(
+                    catalogue.render(start, end, limit),
+                    content_type='application/json'
+                )
+
+        return super().list(request, *args, **kwargs)
+
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     pagination_class = None
+    versioned_model = Tag
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (IsAuthorOrAdminOrReadOnly,)
@@ -109,24 +219,30 @@ class GetAsCreateAndDeleteAPIView(APIView):
     }
 
     def get(self, request, pk):
-        data = dict(user=self.request.user.id, recipe=pk)
+        try:
+            relation, created = self.Meta.model.objects.add(
+                'recipe', only=RecipeMinifiedSerializer.Meta.fields,
+                user=request.user.id, recipe=pk
+            )
+        except Recipe.DoesNotExist:
+            raise does_not_exist('recipe', pk)
 
-        if self.Meta.model.objects.filter(**data).exists():
+        if not created:
             return response.Response(
                 'Ошибка: Рецепт уже добавлен', status.HTTP_400_BAD_REQUEST
             )
 
         serializer = self.Meta.serializer_class(
-            data=data, context={'request': request}
+            relation, context={'request': request}
         )
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
         return response.Response(serializer.data, status.HTTP_201_CREATED)
 
     def delete(self, request, pk):
-        user = self.request.user
-        obj = get_object_or_404(self.Meta.model, user=user, recipe=pk)
-        obj.delete()
+        deleted, _ = self.Meta.model.objects.filter(
+            user=request.user, recipe=pk
+        ).delete()
+        if not deleted:
+            raise Http404
         return response.Response(status=status.HTTP_204_NO_CONTENT)
 
     class Meta:
@@ -135,6 +251,39 @@ class GetAsCreateAndDeleteAPIView(APIView):
         abstract = True
 
 
+class BatchRelationAPIView(APIView):
+    """
+    Base View for adding and removing several recipes at once
+    """
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get_recipes(self):
+        serializer = RecipeBatchSerializer(data=self.request.data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data['recipes']
+
+    def post(self, request):
+        recipes = self.get_recipes()
+        self.Meta.model.objects.add_many(
+            'recipe', [recipe.id for recipe in recipes], user=request.user.id
+        )
+        serializer = RecipeMinifiedSerializer(
+            recipes, many=True, context={'request': request}
+        )
+        return response.Response(serializer.data, status.HTTP_201_CREATED)
+
+    def delete(self, request):
+        recipes = self.get_recipes()
+        self.Meta.model.objects.remove_many(
+            'recipe', [recipe.id for recipe in recipes], user=request.user.id
+        )
+        return response.Response(status=status.HTTP_204_NO_CONTENT)
+
+    class Meta:
+        model = None
+        abstract = True
+
+
 class FavoriteAPIView(GetAsCreateAndDeleteAPIView):
 
     class Meta:
@@ -149,37 +298,83 @@ class ShoppingCartAPIView(GetAsCreateAndDeleteAPIView):
         model = ShoppingCart
 
 
-class SubscribeAPIView(APIView):
+class RecipesLimitMixin:
+    """
+    Reads recipes_limit shared by the subscription views
+    """
+
+    def get_recipes_limit(self):
+        limit = self.request.query_params.get('recipes_limit')
+        if limit is None:
+            return None
+        if not limit.isdigit():
+            raise ValidationError(
+                {'recipes_limit': 'Ожидается целое неотрицательное число'}
+            )
+        return int(limit)
+
+    def prefetch_recipes(self, subscriptions):
+        recipes = Recipe.objects.latest_per_author(
+            [subscription.author_id for subscription in subscriptions],
+            self.get_recipes_limit()
+        ).only(*RecipeMinifiedSerializer.Meta.fields, 'author')
+        prefetch_related_objects(
+            subscriptions, Prefetch('author__recipes', queryset=recipes)
+        )
+
+
+class FavoriteBatchAPIView(BatchRelationAPIView):
+
+    class Meta:
+        model = FavoriteRecipe
+
+
+class ShoppingCartBatchAPIView(BatchRelationAPIView):
+
+    class Meta:
+        model = ShoppingCart
+
+
+class SubscribeAPIView(RecipesLimitMixin, APIView):
     permission_classes = (permissions.IsAuthenticated,)
+    # Author columns the response needs
+    author_fields = (
+        'email', 'username', 'first_name', 'last_name', 'recipes_count'
+    )
 
     def get(self, request, pk):
-        subscriber = self.request.user
-        data = dict(subscriber=subscriber.id, author=pk)
+        try:
+            subscription, created = Subscription.objects.add(
+                'author', only=self.author_fields,
+                subscriber=request.user.id, author=pk
+            )
+        except CustomUser.DoesNotExist:
+            raise does_not_exist('author', pk)
 
-        if Subscription.objects.filter(**data).exists():
+        if not created:
             return response.Response(
                 'Ошибка: Вы уже подписаны на этого пользователя',
                 status.HTTP_400_BAD_REQUEST
             )
 
+        subscription.author.is_subscribed = True
+        self.prefetch_recipes([subscription])
         serializer = SubscriptionSerializer(
-            data=data, context={'request': request}
+            subscription, context={'request': request}
         )
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
         return response.Response(serializer.data, status.HTTP_201_CREATED)
 
     def delete(self, request, pk):
-        subscriber = self.request.user
-        subscription = get_object_or_404(
-            Subscription, subscriber=subscriber, author=pk
-        )
-        subscription.delete()
-
+        deleted, _ = Subscription.objects.filter(
+            subscriber=request.user, author=pk
+        ).delete()
+        if not deleted:
+            raise Http404
         return response.Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class SubscriptionsView(mixins.ListModelMixin, GenericAPIView):
+class SubscriptionsView(RecipesLimitMixin, mixins.ListModelMixin,
+                        GenericAPIView):
     queryset = Subscription.objects.all()
     serializer_class = SubscriptionSerializer
     permission_classes = (permissions.IsAuthenticated,)
@@ -189,5 +384,41 @@ class SubscriptionsView(mixins.ListModelMixin, GenericAPIView):
         queryset = Subscription.objects.filter(subscriber=subscriber)
         return queryset.order_by('-id',)
 
+    def prefetch_feed(self, subscriptions):
+        """
+        Loads authors and their limited recipes for the whole page at once
+        """
+        authors = CustomUser.objects.annotate(is_subscribed=Value(
+            True, output_field=BooleanField()
+        ))
+        prefetch_related_objects(
+            subscriptions, Prefetch('author', queryset=authors)
+        )
+        self.prefetch_recipes(subscriptions)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        subscriptions = list(queryset) if page is None else page
+        self.prefetch_feed(subscriptions)
+        serializer = self.get_serializer(subscriptions, many=True)
+        if page is None:
+            return response.Response(serializer.data)
+        return self.get_paginated_response(serializer.data)
+
     def get(self, request, *args, **kwargs):
         return self.list(request, *args, **kwargs)
+
+
+class MetricsView(APIView):
+    """
+    Per-view latency and SQL histograms in Prometheus text format
+    """
+    permission_classes = (permissions.IsAdminUser,)
+
+    # noinspection PyMethodMayBeStatic
+    def get(self, request):
+        return HttpResponse(
+            histograms.render(),
+            content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
@@ -0,0 +1,21 @@
+class CounterFieldsMixin:
+    """
+    Leaves denormalized counters out of saves of loaded rows. They are
+    changed by atomic UPDATEs only, and a save would write back the values
+    held in memory. Listing a counter in update_fields still saves it.
+    """
+    counter_fields = ()
+
+    def save(self, force_insert=False, force_update=False, using=None,
+             update_fields=None):
+        if update_fields is None and not (
+            self._state.adding or force_insert
+        ):
+            deferred = self.get_deferred_fields()
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+                and field.attname not in deferred
+            ]
+        super().save(force_insert, force_update, using, update_fields)
@@ -0,0 +1,46 @@
+from functools import partial
+
+from django.db.backends.postgresql import base
+from django.utils.asyncio import async_unsafe
+
+from .creation import DatabaseCreation
+from .pool import get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL backend that takes connections from a pool of the process
+    and returns them there instead of closing. Pool options are read from
+    the POOL dictionary of the database settings: SIZE, TIMEOUT and
+    CHECK_AFTER.
+    """
+    creation_class = DatabaseCreation
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = None
+        # Seconds the last checkout waited for a free slot, read by metrics
+        self.pool_wait = None
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        options = self.settings_dict.get('POOL', {})
+        self.pool = get_pool(
+            conn_params,
+            size=options.get('SIZE', 10),
+            timeout=options.get('TIMEOUT', 10.0),
+            check_after=options.get('CHECK_AFTER', 1.0),
+        )
+        connection, waited = self.pool.get(
+            partial(super().get_new_connection, conn_params)
+        )
+        self.pool_wait = waited
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level', connection.isolation_level
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.put(self.connection)
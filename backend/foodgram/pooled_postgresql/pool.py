@@ -0,0 +1,166 @@
+import os
+import threading
+import time
+from collections import deque
+
+import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    """
+    Idle psycopg2 connections of one database. At most size connections are
+    open at once, a checkout waits up to timeout seconds for a free one.
+    """
+    def __init__(self, size=10, timeout=10.0, check_after=1.0):
+        self.size = size
+        self.timeout = timeout
+        self.check_after = check_after
+        self.idle = deque()
+        self.opened = 0
+        self.condition = threading.Condition()
+
+    def get(self, connect):
+        """
+        Most recently returned healthy connection or a new one made by
+        connect, with the seconds spent waiting for a free slot
+        """
+        started = time.monotonic()
+        with self.condition:
+            while not self.idle and self.opened >= self.size:
+                remaining = started + self.timeout - time.monotonic()
+                if remaining <= 0:
+                    raise psycopg2.OperationalError(
+                        f'Нет свободных соединений в пуле из {self.size} '
+                        f'за {self.timeout} с'
+                    )
+                self.condition.wait(remaining)
+            if self.idle:
+                connection, returned_at = self.idle.pop()
+            else:
+                connection, returned_at = None, None
+                self.opened += 1
+        waited = time.monotonic() - started
+
+        if connection is not None and not self.is_healthy(
+            connection, returned_at
+        ):
+            self.close_connection(connection)
+            connection = None
+        if connection is None:
+            try:
+                connection = connect()
+            except Exception:
+                self.release()
+                raise
+        return connection, waited
+
+    def is_healthy(self, connection, returned_at):
+        """
+        Pings connections idle for longer than check_after seconds
+        """
+        if connection.closed:
+            return False
+        if time.monotonic() - returned_at < self.check_after:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            if connection.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+        except psycopg2.Error:
+            return False
+        return True
+
+    def put(self, connection):
+        """
+        Takes a connection back, rolling back its open transaction and
+        discarding the session state. Broken connections are closed and free
+        their slot.
+        """
+        try:
+            status = connection.get_transaction_status()
+            if not connection.closed and status != TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+            if not connection.closed:
+                self.reset(connection)
+            reusable = not connection.closed
+        except psycopg2.Error:
+            reusable = False
+        if not reusable:
+            self.close_connection(connection)
+            self.release()
+            return
+        with self.condition:
+            self.idle.append((connection, time.monotonic()))
+            self.condition.notify()
+
+    @staticmethod
+    def reset(connection):
+        """
+        Closes cursors left open WITH HOLD, such as of an abandoned
+        iterator(), and drops SET values, prepared statements and temporary
+        tables. DISCARD ALL can't run in a transaction block.
+        """
+        autocommit = connection.autocommit
+        connection.autocommit = True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('DISCARD ALL')
+        finally:
+            connection.autocommit = autocommit
+
+    def release(self):
+        with self.condition:
+            self.opened -= 1
+            self.condition.notify()
+
+    def close(self):
+        """
+        Closes the idle connections
+        """
+        with self.condition:
+            idle, self.idle = self.idle, deque()
+            self.opened -= len(idle)
+            self.condition.notify_all()
+        for connection, _ in idle:
+            self.close_connection(connection)
+
+    @staticmethod
+    def close_connection(connection):
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+
+
+def get_pool(conn_params, **options):
+    """
+    Pool of this process for the given connection parameters. A forked
+    worker gets its own pools and leaves the inherited connections alone.
+    """
+    key = (os.getpid(), tuple(sorted(
+        (name, str(value)) for name, value in conn_params.items()
+    )))
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(**options)
+        return _pools[key]
+
+
+def close_pools(database=None):
+    """
+    Closes idle connections of this process, to the given database only if
+    it is set
+    """
+    with _pools_lock:
+        pools = [
+            pool for (pid, params), pool in _pools.items()
+            if pid == os.getpid()
+            and (database is None or ('database', database) in params)
+        ]
+    for pool in pools:
+        pool.close()
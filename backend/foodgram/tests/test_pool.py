@@ -0,0 +1,165 @@
+import psycopg2
+import pytest
+from django.db import connections
+from psycopg2 import errors
+from psycopg2.extensions import (TRANSACTION_STATUS_IDLE,
+                                 TRANSACTION_STATUS_INTRANS)
+
+from foodgram.pooled_postgresql.pool import ConnectionPool
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, sql):
+        if self.connection.closed:
+            raise psycopg2.InterfaceError('connection already closed')
+        if sql == 'DISCARD ALL' and not self.connection.autocommit:
+            raise errors.ActiveSqlTransaction(
+                'DISCARD ALL cannot run inside a transaction block'
+            )
+        self.connection.executed.append(sql)
+
+
+class FakeConnection:
+    """
+    The part of a psycopg2 connection the pool uses
+    """
+    def __init__(self):
+        self.closed = 0
+        self.autocommit = False
+        self.status = TRANSACTION_STATUS_IDLE
+        self.executed = []
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+def test_checkout_times_out_when_full():
+    pool = ConnectionPool(size=1, timeout=0.05)
+    pool.get(FakeConnection)
+
+    with pytest.raises(psycopg2.OperationalError):
+        pool.get(FakeConnection)
+
+
+def test_returned_connection_reused():
+    pool = ConnectionPool(size=1, timeout=0.05)
+    connection, _ = pool.get(FakeConnection)
+    pool.put(connection)
+
+    assert pool.get(FakeConnection)[0] is connection
+
+
+def test_closed_idle_connection_replaced():
+    pool = ConnectionPool(size=1, timeout=0.05)
+    broken, _ = pool.get(FakeConnection)
+    pool.put(broken)
+    broken.close()
+
+    connection, _ = pool.get(FakeConnection)
+
+    assert connection is not broken
+    assert not connection.closed
+    assert pool.opened == 1
+
+
+def test_stale_connection_pinged():
+    pool = ConnectionPool(size=1, timeout=0.05, check_after=0)
+    connection, _ = pool.get(FakeConnection)
+    pool.put(connection)
+
+    assert pool.get(FakeConnection)[0] is connection
+    assert connection.executed == ['DISCARD ALL', 'SELECT 1']
+
+
+def test_open_transaction_rolled_back_on_put():
+    pool = ConnectionPool(size=1, timeout=0.05)
+    connection, _ = pool.get(FakeConnection)
+    connection.status = TRANSACTION_STATUS_INTRANS
+
+    pool.put(connection)
+
+    assert connection.rollbacks == 1
+    assert pool.get(FakeConnection)[0] is connection
+
+
+def test_session_discarded_on_put():
+    pool = ConnectionPool(size=1, timeout=0.05)
+    connection, _ = pool.get(FakeConnection)
+
+    pool.put(connection)
+
+    assert connection.executed == ['DISCARD ALL']
+    assert connection.autocommit is False
+    assert pool.get(FakeConnection)[0] is connection
+
+
+def test_closed_connection_frees_slot_on_put():
+    pool = ConnectionPool(size=1, timeout=0.05)
+    connection, _ = pool.get(FakeConnection)
+    connection.close()
+
+    pool.put(connection)
+
+    assert pool.opened == 0
+    assert not pool.idle
+
+
+def test_failed_connect_frees_slot():
+    pool = ConnectionPool(size=1, timeout=0.05)
+
+    def connect():
+        raise psycopg2.OperationalError('could not connect')
+
+    with pytest.raises(psycopg2.OperationalError):
+        pool.get(connect)
+
+    assert pool.opened == 0
+    assert not pool.get(FakeConnection)[0].closed
+
+
+def query(wrapper, sql):
+    with wrapper.cursor() as cursor:
+        cursor.execute(sql)
+        return cursor.fetchall()
+
+
+@pytest.mark.django_db
+def test_backend_returns_clean_connections():
+    wrapper = connections.create_connection('default')
+    if not hasattr(wrapper, 'pool'):
+        pytest.skip('Тесты работают без foodgram.pooled_postgresql')
+    try:
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        with wrapper.connection.cursor() as cursor:
+            cursor.execute("SET application_name = 'leftover'")
+            cursor.execute('DECLARE leftover CURSOR WITH HOLD FOR SELECT 1')
+        wrapper.close()
+        assert wrapper.connection is None
+
+        wrapper.ensure_connection()
+        assert wrapper.connection is raw
+        assert query(wrapper, 'SELECT count(*) FROM pg_cursors') == [(0,)]
+        assert query(wrapper, 'SHOW application_name') != [('leftover',)]
+    finally:
+        wrapper.close()
@@ -6,6 +6,8 @@ from django.core.validators import EmailValidator
 from django.db import models
 from django.utils import timezone
 
+from foodgram.counter_fields import CounterFieldsMixin
+
 
 class CustomUserManager(BaseUserManager):
     def _create_user(
@@ -48,8 +50,9 @@ class CustomUserManager(BaseUserManager):
         )
 
 
-class CustomUser(AbstractBaseUser, PermissionsMixin):
+class CustomUser(CounterFieldsMixin, AbstractBaseUser, PermissionsMixin):
     username_validator = UnicodeUsernameValidator
+    counter_fields = ('recipes_count', 'subscribers_count')
 
     first_name = models.CharField(max_length=150, verbose_name='Имя')
     last_name = models.CharField(max_length=150, verbose_name='Фамилия')
@@ -69,6 +72,12 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     is_active = models.BooleanField(default=True)
     date_joined = models.DateTimeField(default=timezone.now)
     last_login = models.DateTimeField(null=True)
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Количество рецептов', default=0, editable=False
+    )
+    subscribers_count = models.PositiveIntegerField(
+        verbose_name='Количество подписчиков', default=0, editable=False
+    )
 
     objects = CustomUserManager()
 